@@ -16,7 +16,8 @@ from behave_tests.features.testipy_report import (
     start_scenario,
     end_scenario,
     start_step,
-    end_step
+    end_step,
+    test_info
 )
 
 # behave -D testipy="-rid 5 -r web -r-web-port 9204 -r log" behave_tests/features/pkg07 --no-capture --no-capture-stderr
@@ -48,8 +49,10 @@ def after_feature(context: Context, feature: Feature):
 def before_scenario(context: Context, scenario: Scenario | ScenarioOutline):
     use_fixture(capture_logs, context)
     start_scenario(context, scenario)
+    start_query_profiling(context, scenario)
 
 def after_scenario(context: Context, scenario: Scenario | ScenarioOutline):
+    report_query_profiling(context)
     end_scenario(context, scenario)
 
 
@@ -62,6 +65,19 @@ def after_step(context: Context, step: Step):
     context.step = None
 
 
+def start_query_profiling(context: Context, scenario: Scenario | ScenarioOutline):
+    query_manager = getattr(context, "query_manager", None)
+    if query_manager is not None and query_manager.profiler.enabled:
+        query_manager.profiler.start_scope(scenario.name)
+
+def report_query_profiling(context: Context):
+    query_manager = getattr(context, "query_manager", None)
+    if query_manager is not None and query_manager.profiler.enabled:
+        report = query_manager.profiler.render_rollup()
+        if report:
+            test_info(context, f"SQL profile:\n{report}", level="INFO")
+
+
 @fixture
 def capture_logs(context: Context):
     stdout, stderr, stdout_redirect, stderr_redirect = _capture_output(context)
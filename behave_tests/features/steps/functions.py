@@ -41,25 +41,28 @@ def verify_field_types(context: Context, results_list: list[dict]) -> None:
     if not isinstance(results_list, list):
         results_list = [results_list]
 
+    # resolved once, not for every row
+    expected_types_by_column: dict[str, tuple[list[str], frozenset[type]]] = {}
+    for expected_column in expected_column_types:
+        expected_types: list[str] = expected_column["column_type"].split(",")
+        expected_types_by_column[expected_column["column_name"]] = (
+            expected_types,
+            frozenset(_get_equivalent_python_type(t.strip().lower()) for t in expected_types),
+        )
+    expected_len = len(expected_column_types.rows)
+
     for row in results_list:
         assert_that(
             row.keys(), "Saved query_results don't have same amount of columns"
-        ).is_length(len(expected_column_types.rows))
-
-        for expected_column in expected_column_types:
-            column_name: str = expected_column["column_name"]
-            expected_types: list[str] = expected_column["column_type"].split(",")
+        ).is_length(expected_len)
 
+        for column_name, (expected_types, python_types) in expected_types_by_column.items():
             assert (
                 column_name in row
             ), f"Missing column {column_name} in saved query_results"
 
             observed_type = type(row[column_name])
-            for expected_type in expected_types:
-                expected_python_type = _get_equivalent_python_type(expected_type.strip().lower())
-                if expected_python_type == observed_type:
-                    break
-            else:
+            if observed_type not in python_types:
                 raise ValueError(
                     f"Unexpected type {observed_type} for {column_name}. {expected_types=}"
                 )
@@ -1,4 +1,8 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from .diff import diff
+from .matching import DEFAULT_MAX_DIFFERENCES, fingerprint, match_identical
+from .parallel_compare import diff_parallel
 
 
 class HandledError(AssertionError):
@@ -32,16 +36,14 @@ def assert_same_len(expected_len, received_len, *, where: str = "response") -> N
 
 
 def assert_expected_type(expected_type, received_type, *, where: str = "response") -> None:
-    if not isinstance(expected_type, list):
-        expected_type = [expected_type]
+    """`expected_type` is a type or a list of them, where None allows nulls. It isn't modified."""
+    expected_types = expected_type if isinstance(expected_type, list) else [expected_type]
+    allowed = [t for t in expected_types if t is not None]
 
-    if received_type is None and None not in expected_type:
-        raise UnexpectedTypeError(f"'Null' not allowed in {where}, only {expected_type}")
-    else:
-        if None in expected_type:
-            expected_type.remove(None)
-        if not isinstance(received_type, tuple(expected_type)):
-            raise UnexpectedTypeError(f"Expected {where} to be a {expected_type}, not {type(received_type)}")
+    if received_type is None and None not in expected_types:
+        raise UnexpectedTypeError(f"'Null' not allowed in {where}, only {expected_types}")
+    elif received_type is not None and not isinstance(received_type, tuple(allowed)):
+        raise UnexpectedTypeError(f"Expected {where} to be a {allowed}, not {type(received_type)}")
 
 
 def assert_expected_value(expected_value, received_value, *, where: str = "response") -> None:
@@ -55,8 +57,22 @@ def assert_equal_complex_object(
     *,
     expected_name: str = "expected",
     received_name: str = "received",
+    fail_fast: bool = True,
+    max_differences: int = DEFAULT_MAX_DIFFERENCES,
 ) -> None:
-    """Compare two objects, either a list or dict with nested fields, or basic objects"""
+    """Compare two objects, either a list or dict with nested fields, or basic objects
+
+    Raises at the first difference, or with `fail_fast=False` after collecting up to
+    `max_differences` of them in a single report.
+    """
+    if not fail_fast:
+        report = diff(
+            expected, received, expected_name=expected_name, received_name=received_name, max_differences=max_differences
+        )
+        if report:
+            raise AssertionError(report.render(f"{expected_name} != {received_name}"))
+        return
+
     if isinstance(expected, dict) and isinstance(received, dict):
         assert_equal_dicts(
             expected, received, expected_name=expected_name, received_name=received_name
@@ -73,6 +89,30 @@ def assert_equal_complex_object(
         ), f"{expected_name} = '{expected}' not equal to {received_name} = '{received}'"
 
 
+def assert_equal_partitioned(
+    expected: Dict | List,
+    received: Dict | List,
+    *,
+    key_columns: Optional[str | List[str]] = None,
+    ordered: bool = False,
+    workers: Optional[int] = None,
+    expected_name: str = "expected",
+    received_name: str = "received",
+    max_differences: int = DEFAULT_MAX_DIFFERENCES,
+) -> None:
+    """Compare large top level dicts or lists in partitions, in a pool of `workers` processes.
+
+    Lists are matched by position when `ordered`, or by `key_columns`. Raises a report of
+    all the differences, see `parallel_compare.diff_parallel`.
+    """
+    report = diff_parallel(
+        expected, received, key_columns=key_columns, ordered=ordered, workers=workers,
+        expected_name=expected_name, received_name=received_name, max_differences=max_differences,
+    )
+    if report:
+        raise AssertionError(report.render(f"{expected_name} != {received_name}"))
+
+
 def assert_equal_dicts(
     expected: Dict,
     received: Dict,
@@ -106,9 +146,11 @@ def assert_equal_lists(
             len(expected) == len(received)
         ), f"{expected_name} has {len(expected)} elements != {received_name} has {len(received)} elements"
 
-    list2 = list(received)
+    matched_expected, remaining = match_identical(expected, received)
     for i1, v1 in enumerate(expected):
-        for i2, v2 in enumerate(list2):
+        if i1 in matched_expected:
+            continue
+        for pos, (i2, v2) in enumerate(remaining):
             try:
                 assert_equal_complex_object(
                     v1,
@@ -119,10 +161,98 @@ def assert_equal_lists(
             except AssertionError:
                 pass
             else:
-                list2.remove(v2)
+                del remaining[pos]
                 break
         else:
             raise AssertionError(f"{expected_name}[{i1}] '{v1}' is not inside {received_name}")
 
 
-__all__ = ["HandledError", "assert_same_len", "assert_expected_type", "assert_expected_value", "assert_equal_complex_object", "assert_equal_dicts", "assert_equal_lists"]
+def assert_equal_records_by_key(
+    expected: List[Dict],
+    received: List[Dict],
+    key_columns: str | List[str],
+    *,
+    expected_name: str = "expected",
+    received_name: str = "received",
+    same_len: bool = True,
+    max_reported: int = 10,
+) -> None:
+    """Compare two lists of rows matched by their key columns, in a single pass over each list.
+
+    Expected rows are compared with `assert_equal_dicts`. Missing, mismatched and, with
+    `same_len`, extra or duplicated received rows are all reported together.
+    """
+    if isinstance(key_columns, str):
+        key_columns = [key_columns]
+
+    def _key(row: Dict, name: str) -> tuple:
+        missing = [column for column in key_columns if column not in row]
+        if missing:
+            raise ExpectedFieldMissingError(f"{name} has no key column {missing}")
+        return tuple(row[column] for column in key_columns)
+
+    received_by_key: dict[tuple, int] = {}
+    duplicated = []
+    for i2, row in enumerate(received):
+        key = _key(row, f"{received_name}[{i2}]")
+        if key in received_by_key:
+            duplicated.append(key)
+        else:
+            received_by_key[key] = i2
+
+    missing, mismatched, seen = [], [], set()
+    for i1, row in enumerate(expected):
+        key = _key(row, f"{expected_name}[{i1}]")
+        if key in seen:
+            raise ValueError(f"{expected_name} has more than one row with key {key}")
+        seen.add(key)
+        i2 = received_by_key.get(key)
+        if i2 is None:
+            missing.append(key)
+            continue
+        try:
+            assert_equal_dicts(
+                row,
+                received[i2],
+                expected_name=f"{expected_name}[{i1}]",
+                received_name=f"{received_name}[{i2}]",
+            )
+        except AssertionError as exc:
+            mismatched.append(f"{key}: {exc}")
+
+    extra = [key for key in received_by_key if key not in seen] if same_len else []
+    if not same_len:
+        duplicated = []
+    if not (missing or mismatched or extra or duplicated):
+        return
+
+    def _section(title: str, items: list) -> list[str]:
+        if not items:
+            return []
+        lines = [f"{len(items)} {title}:"] + [f"  {item}" for item in items[:max_reported]]
+        if len(items) > max_reported:
+            lines.append(f"  ... and {len(items) - max_reported} more")
+        return lines
+
+    key_names = ", ".join(key_columns)
+    raise AssertionError("\n".join([
+        f"{expected_name} and {received_name} differ by ({key_names}):",
+        *_section(f"keys missing from {received_name}", missing),
+        *_section("rows with different values", mismatched),
+        *_section(f"unexpected keys in {received_name}", extra),
+        *_section(f"keys repeated in {received_name}", duplicated),
+    ]))
+
+
+__all__ = [
+    "HandledError",
+    "assert_same_len",
+    "assert_expected_type",
+    "assert_expected_value",
+    "assert_equal_complex_object",
+    "assert_equal_dicts",
+    "assert_equal_lists",
+    "assert_equal_records_by_key",
+    "assert_equal_partitioned",
+    "fingerprint",
+]
@@ -0,0 +1,131 @@
+import reprlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from .matching import DEFAULT_MAX_DIFFERENCES, match_identical
+
+
+short_repr = reprlib.Repr()
+short_repr.maxstring = 80
+short_repr.maxother = 80
+short_repr.maxdict = 6
+short_repr.maxlist = 6
+
+
+@dataclass
+class Difference:
+    path: str
+    message: str
+
+    def __str__(self):
+        return f"{self.path}: {self.message}"
+
+
+@dataclass
+class DiffReport:
+    """Differences found by `diff`, up to `max_differences` of them."""
+
+    max_differences: int = DEFAULT_MAX_DIFFERENCES
+    differences: List[Difference] = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.differences)
+
+    @property
+    def full(self) -> bool:
+        """When full the walk stops, there may be more differences."""
+        return len(self.differences) >= self.max_differences
+
+    def add(self, path: str, message: str) -> None:
+        if not self.full:
+            self.differences.append(Difference(path, message))
+
+    def render(self, title: str = "") -> str:
+        more = f", stopped at {self.max_differences}" if self.full else ""
+        lines = [f"{title + ': ' if title else ''}{len(self.differences)} differences{more}"]
+        lines.extend(f"  {difference}" for difference in self.differences)
+        return "\n".join(lines)
+
+
+def diff(
+    expected: Any,
+    received: Any,
+    *,
+    expected_name: str = "expected",
+    received_name: str = "received",
+    max_differences: int = DEFAULT_MAX_DIFFERENCES,
+    same_len: bool = True,
+) -> DiffReport:
+    """Every difference between two objects, with the same rules as `assert_equal_complex_object`.
+
+    Only the keys of expected dicts are checked, and lists are compared in any order;
+    without `same_len` a top level list may have extra elements. Stops walking once
+    `max_differences` were found.
+    """
+    report = DiffReport(max_differences=max_differences)
+    if isinstance(expected, (list, tuple, set)) and isinstance(received, (list, tuple, set)):
+        _diff_lists(list(expected), list(received), expected_name, received_name, report, same_len)
+    else:
+        diff_into(expected, received, expected_name, received_name, report)
+    return report
+
+
+def diff_into(expected: Any, received: Any, expected_path: str, received_path: str, report: DiffReport) -> None:
+    if report.full:
+        return
+    if isinstance(expected, dict) and isinstance(received, dict):
+        diff_dicts_into(expected, received, expected_path, received_path, report)
+    elif isinstance(expected, (list, tuple, set)) and isinstance(received, (list, tuple, set)):
+        _diff_lists(list(expected), list(received), expected_path, received_path, report)
+    elif not expected == received:
+        report.add(
+            expected_path,
+            f"{short_repr.repr(expected)} not equal to {received_path} = {short_repr.repr(received)}",
+        )
+
+
+def diff_dicts_into(expected: Dict, received: Dict, expected_path: str, received_path: str, report: DiffReport) -> None:
+    for key in expected:
+        if key not in received:
+            report.add(f"{expected_path}.{key}", f"is not in dict {received_path}")
+        else:
+            diff_into(expected[key], received[key], f"{expected_path}.{key}", f"{received_path}.{key}", report)
+        if report.full:
+            return
+
+
+def values_equal(expected: Any, received: Any) -> bool:
+    probe = DiffReport(max_differences=1)
+    diff_into(expected, received, "", "", probe)
+    return not probe
+
+
+def _diff_lists(
+    expected: List, received: List, expected_path: str, received_path: str, report: DiffReport, same_len: bool = True
+) -> None:
+    if same_len and len(expected) != len(received):
+        report.add(expected_path, f"has {len(expected)} elements != {received_path} has {len(received)} elements")
+
+    matched_expected, remaining = match_identical(expected, received)
+    unmatched = []
+    for i1, v1 in enumerate(expected):
+        if i1 in matched_expected:
+            continue
+        for pos, (i2, v2) in enumerate(remaining):
+            if values_equal(v1, v2):
+                del remaining[pos]
+                break
+        else:
+            unmatched.append(i1)
+
+    if not same_len:
+        remaining = []
+    if len(unmatched) == 1 and len(remaining) == 1:
+        # a single element changed: show what changed in it
+        i2 = remaining[0][0]
+        diff_into(expected[unmatched[0]], received[i2], f"{expected_path}[{unmatched[0]}]", f"{received_path}[{i2}]", report)
+        return
+    for i1 in unmatched:
+        report.add(f"{expected_path}[{i1}]", f"{short_repr.repr(expected[i1])} is not inside {received_path}")
+    for i2, v2 in remaining:
+        report.add(f"{received_path}[{i2}]", f"{short_repr.repr(v2)} was not expected")
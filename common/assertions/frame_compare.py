@@ -0,0 +1,166 @@
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .matching import DEFAULT_MAX_DIFFERENCES
+
+
+@dataclass
+class CellMismatch:
+    key: tuple
+    column: str
+    expected: Any
+    received: Any
+
+    def __str__(self):
+        return f"{self.key}.{self.column}: expected '{self.expected}', received '{self.received}'"
+
+
+@dataclass
+class FrameComparison:
+    missing_keys: List[tuple] = field(default_factory=list)
+    extra_keys: List[tuple] = field(default_factory=list)
+    missing_columns: List[str] = field(default_factory=list)
+    mismatches: List[CellMismatch] = field(default_factory=list)
+
+    @property
+    def equal(self) -> bool:
+        return not (self.missing_keys or self.extra_keys or self.missing_columns or self.mismatches)
+
+    def render(self, title: str = "", max_reported: int = DEFAULT_MAX_DIFFERENCES) -> str:
+        lines = [title] if title else []
+        for name, items in (
+            ("columns missing from received", self.missing_columns),
+            ("keys missing from received", self.missing_keys),
+            ("unexpected keys in received", self.extra_keys),
+            ("different cells", self.mismatches),
+        ):
+            if items:
+                lines.append(f"{len(items)} {name}:")
+                lines.extend(f"  {item}" for item in items[:max_reported])
+                if len(items) > max_reported:
+                    lines.append(f"  ... and {len(items) - max_reported} more")
+        return "\n".join(lines)
+
+
+def _as_frame(table: pd.DataFrame | List[Dict]) -> pd.DataFrame:
+    return table if isinstance(table, pd.DataFrame) else pd.DataFrame.from_records(list(table))
+
+
+def _keyed(frame: pd.DataFrame, key_columns: List[str], name: str) -> pd.DataFrame:
+    missing = [column for column in key_columns if column not in frame.columns]
+    if missing:
+        raise KeyError(f"{name} has no key column {missing}")
+    keyed = frame.set_index(key_columns)
+    if not keyed.index.is_unique:
+        duplicated = keyed.index[keyed.index.duplicated()].unique().tolist()
+        raise ValueError(f"{name} has more than one row for keys {duplicated[:10]}")
+    return keyed
+
+
+def _key_tuple(key: Any) -> tuple:
+    return key if isinstance(key, tuple) else (key,)
+
+
+def _equal_cells(
+    expected: pd.Series,
+    received: pd.Series,
+    tolerance: Optional[float],
+    window: Optional[tuple[timedelta, timedelta]],
+) -> np.ndarray:
+    both_null = (expected.isna() & received.isna()).to_numpy()
+    if window is not None:
+        expected_at = pd.to_datetime(expected, utc=True, errors="coerce", format="ISO8601")
+        received_at = pd.to_datetime(received, utc=True, errors="coerce", format="ISO8601")
+        delta = received_at - expected_at
+        before, after = window
+        return ((delta >= -pd.Timedelta(before)) & (delta <= pd.Timedelta(after))).to_numpy() | both_null
+    if tolerance is not None:
+        expected_number = pd.to_numeric(expected, errors="coerce").astype(float).to_numpy()
+        received_number = pd.to_numeric(received, errors="coerce").astype(float).to_numpy()
+        close = np.isclose(expected_number, received_number, rtol=0, atol=tolerance)
+        return close | both_null
+    return (expected == received).to_numpy() | both_null
+
+
+def compare_frames(
+    expected: pd.DataFrame | List[Dict],
+    received: pd.DataFrame | List[Dict],
+    key_columns: str | List[str],
+    *,
+    columns: Optional[List[str]] = None,
+    tolerances: Optional[Dict[str, float]] = None,
+    datetime_windows: Optional[Dict[str, timedelta | tuple[timedelta, timedelta]]] = None,
+) -> FrameComparison:
+    """Compare two tables aligned on their key columns, a whole column at a time.
+
+    Tables are DataFrames or lists of rows (as from `QueryManager.get_table`). Like the
+    dict comparisons, only the expected columns are checked, unless `columns` are given.
+    Numeric columns in `tolerances` match within an absolute tolerance, and datetime
+    columns in `datetime_windows` when received is within the window of expected: a
+    timedelta either side, or a (before, after) pair. Nulls only match nulls.
+    """
+    if isinstance(key_columns, str):
+        key_columns = [key_columns]
+    tolerances = tolerances or {}
+    windows = {
+        column: window if isinstance(window, tuple) else (window, window)
+        for column, window in (datetime_windows or {}).items()
+    }
+
+    expected_frame = _keyed(_as_frame(expected), key_columns, "expected")
+    received_frame = _keyed(_as_frame(received), key_columns, "received")
+    result = FrameComparison()
+
+    if columns is None:
+        columns = list(expected_frame.columns)
+    result.missing_columns = [column for column in columns if column not in received_frame.columns]
+    columns = [column for column in columns if column in received_frame.columns]
+
+    result.missing_keys = [_key_tuple(key) for key in expected_frame.index.difference(received_frame.index, sort=False)]
+    result.extra_keys = [_key_tuple(key) for key in received_frame.index.difference(expected_frame.index, sort=False)]
+    common = expected_frame.index.intersection(received_frame.index, sort=False)
+    if len(common) == 0 or not columns:
+        return result
+
+    expected_aligned = expected_frame.loc[common, columns]
+    received_aligned = received_frame.loc[common, columns]
+    for column in columns:
+        equal = _equal_cells(
+            expected_aligned[column], received_aligned[column], tolerances.get(column), windows.get(column)
+        )
+        for position in np.flatnonzero(~equal):
+            result.mismatches.append(CellMismatch(
+                key=_key_tuple(common[position]),
+                column=column,
+                expected=expected_aligned[column].iat[position],
+                received=received_aligned[column].iat[position],
+            ))
+    return result
+
+
+def assert_equal_frames(
+    expected: pd.DataFrame | List[Dict],
+    received: pd.DataFrame | List[Dict],
+    key_columns: str | List[str],
+    *,
+    columns: Optional[List[str]] = None,
+    tolerances: Optional[Dict[str, float]] = None,
+    datetime_windows: Optional[Dict[str, timedelta | tuple[timedelta, timedelta]]] = None,
+    same_len: bool = True,
+    max_reported: int = DEFAULT_MAX_DIFFERENCES,
+) -> None:
+    """Raise an AssertionError describing every difference found by `compare_frames`.
+
+    Without `same_len` received may have rows with other keys.
+    """
+    result = compare_frames(
+        expected, received, key_columns, columns=columns, tolerances=tolerances, datetime_windows=datetime_windows
+    )
+    if not same_len:
+        result.extra_keys = []
+    if not result.equal:
+        raise AssertionError(result.render("expected and received tables differ:", max_reported))
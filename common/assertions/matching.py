@@ -0,0 +1,67 @@
+from collections import Counter, deque
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Hashable, List, Optional
+from uuid import UUID
+
+
+DEFAULT_MAX_DIFFERENCES = 50
+
+# Compared exactly by their value, other types (eg: DatetimeCompare) may define a looser __eq__
+_EXACT_TYPES = frozenset({str, int, float, bool, bytes, type(None), Decimal, datetime, date, time, timedelta, UUID})
+
+
+def fingerprint(value: Any) -> Optional[Hashable]:
+    """Hashable canonical form of a value, equal only for values that compare as equal.
+
+    Dicts and lists (in any order) are normalized recursively. None when the value,
+    or anything nested in it, can only be compared with `assert_equal_complex_object`.
+    """
+    kind = type(value)
+    if kind in _EXACT_TYPES:
+        if (kind is float and value != value) or (kind is Decimal and value.is_nan()):
+            # NaN isn't equal to itself
+            return None
+        return kind, value
+    if isinstance(value, dict):
+        items = []
+        for key, item in value.items():
+            item_fingerprint = fingerprint(item)
+            if item_fingerprint is None:
+                return None
+            items.append((key, item_fingerprint))
+        return dict, frozenset(items)
+    if isinstance(value, (list, tuple, set)):
+        elements = []
+        for element in value:
+            element_fingerprint = fingerprint(element)
+            if element_fingerprint is None:
+                return None
+            elements.append(element_fingerprint)
+        return list, frozenset(Counter(elements).items())
+    return None
+
+
+def match_identical(expected: List, received: List) -> tuple[set[int], list[tuple[int, Any]]]:
+    """Pair elements with the same fingerprint, in a single pass over each list.
+
+    Returns the indexes of the paired expected elements and the unpaired (index, element)
+    of received, in order. An identical pair is always a valid match, since an expected
+    dict only needs its own keys in the received one.
+    """
+    by_fingerprint: dict[Hashable, deque[int]] = {}
+    for i2, v2 in enumerate(received):
+        v2_fingerprint = fingerprint(v2)
+        if v2_fingerprint is not None:
+            by_fingerprint.setdefault(v2_fingerprint, deque()).append(i2)
+
+    matched_expected, matched_received = set(), set()
+    for i1, v1 in enumerate(expected):
+        v1_fingerprint = fingerprint(v1)
+        candidates = by_fingerprint.get(v1_fingerprint) if v1_fingerprint is not None else None
+        if candidates:
+            matched_expected.add(i1)
+            matched_received.add(candidates.popleft())
+
+    remaining = [(i2, v2) for i2, v2 in enumerate(received) if i2 not in matched_received]
+    return matched_expected, remaining
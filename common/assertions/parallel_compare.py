@@ -0,0 +1,156 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .diff import DiffReport, diff, diff_dicts_into, diff_into, short_repr
+from .matching import DEFAULT_MAX_DIFFERENCES
+
+
+DEFAULT_MIN_PARTITION_SIZE = 1_000
+
+# (sort key, path, message), sorted by the parent to merge partitions deterministically
+_Found = tuple[tuple, str, str]
+
+
+def diff_parallel(
+    expected: Any,
+    received: Any,
+    *,
+    key_columns: Optional[str | List[str]] = None,
+    ordered: bool = False,
+    workers: Optional[int] = None,
+    expected_name: str = "expected",
+    received_name: str = "received",
+    max_differences: int = DEFAULT_MAX_DIFFERENCES,
+    min_partition_size: int = DEFAULT_MIN_PARTITION_SIZE,
+) -> DiffReport:
+    """`diff` of large top level dicts or lists, split in partitions compared in a process pool.
+
+    Dicts are split by key. Lists are split by position when `ordered`, comparing the
+    elements at the same index, or by the hash of `key_columns`, matching rows by
+    key. Other lists are compared with `diff`, and anything smaller than two partitions
+    in this process. The values must be picklable. The report is the same whatever the number
+    of workers: differences are sorted by position before keeping `max_differences`.
+    """
+    workers = workers or os.cpu_count() or 1
+    if isinstance(key_columns, str):
+        key_columns = [key_columns]
+    is_list = isinstance(expected, (list, tuple)) and isinstance(received, (list, tuple))
+    size = max(len(expected), len(received)) if is_list or isinstance(expected, dict) else 0
+    partitions = max(1, min(workers, size // max(min_partition_size, 1)))
+    if not (isinstance(expected, dict) and isinstance(received, dict)) and not (is_list and (ordered or key_columns)):
+        return diff(
+            expected, received, expected_name=expected_name, received_name=received_name,
+            max_differences=max_differences,
+        )
+
+    names = (expected_name, received_name, max_differences)
+    found: List[_Found] = []
+    if isinstance(expected, dict):
+        keys = list(expected)
+        bounds = [len(keys) * part // partitions for part in range(partitions + 1)]
+        tasks = [
+            (_diff_dict_partition, part, {k: expected[k] for k in chunk}, {k: received[k] for k in chunk if k in received}, *names)
+            for part, chunk in enumerate(keys[start:end] for start, end in zip(bounds, bounds[1:]))
+        ]
+    elif ordered:
+        common = min(len(expected), len(received))
+        if len(expected) != len(received):
+            found.append(((-1, 0, 0), expected_name, f"has {len(expected)} elements != {received_name} has {len(received)} elements"))
+        for i1 in range(common, len(expected)):
+            found.append(((0, i1, 0), f"{expected_name}[{i1}]", f"{short_repr.repr(expected[i1])} is not inside {received_name}"))
+        for i2 in range(common, len(received)):
+            found.append(((1, i2, 0), f"{received_name}[{i2}]", f"{short_repr.repr(received[i2])} was not expected"))
+        bounds = [common * part // partitions for part in range(partitions + 1)]
+        tasks = [
+            (_diff_positional_partition, start, list(expected[start:end]), list(received[start:end]), *names)
+            for start, end in zip(bounds, bounds[1:])
+        ]
+    else:
+        expected_parts: List[List[tuple[int, Dict]]] = [[] for _ in range(partitions)]
+        received_parts: List[List[tuple[int, Dict]]] = [[] for _ in range(partitions)]
+        for rows, parts in ((expected, expected_parts), (received, received_parts)):
+            for index, row in enumerate(rows):
+                parts[_partition_of(tuple(row[c] for c in key_columns), partitions)].append((index, row))
+        tasks = [
+            (_diff_keyed_partition, key_columns, expected_part, received_part, *names)
+            for expected_part, received_part in zip(expected_parts, received_parts)
+        ]
+
+    if len(tasks) == 1:
+        found.extend(_run_task(tasks[0]))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            for result in executor.map(_run_task, tasks):
+                found.extend(result)
+
+    report = DiffReport(max_differences=max_differences)
+    for _, path, message in sorted(found, key=lambda item: item[0]):
+        report.add(path, message)
+    return report
+
+
+def _partition_of(key: tuple, partitions: int) -> int:
+    # keys equal to each other have the same hash, eg: 1, 1.0 and Decimal("1"), as rows are matched by
+    # a dict lookup. Only this process partitions, so it doesn't matter that str hashes differ between runs
+    return hash(key) % partitions
+
+
+def _run_task(task: tuple) -> List[_Found]:
+    function, *args = task
+    return function(*args)
+
+
+def _diff_dict_partition(
+    part: int, expected: Dict, received: Dict, expected_name: str, received_name: str, max_differences: int
+) -> List[_Found]:
+    report = DiffReport(max_differences=max_differences)
+    diff_dicts_into(expected, received, expected_name, received_name, report)
+    return [((0, part, n), d.path, d.message) for n, d in enumerate(report.differences)]
+
+
+def _diff_positional_partition(
+    start: int, expected: List, received: List, expected_name: str, received_name: str, max_differences: int
+) -> List[_Found]:
+    found = []
+    for offset, (expected_value, received_value) in enumerate(zip(expected, received)):
+        index = start + offset
+        report = DiffReport(max_differences=max_differences - len(found))
+        diff_into(expected_value, received_value, f"{expected_name}[{index}]", f"{received_name}[{index}]", report)
+        found.extend(((0, index, n), d.path, d.message) for n, d in enumerate(report.differences))
+        if len(found) >= max_differences:
+            break
+    return found
+
+
+def _diff_keyed_partition(
+    key_columns: List[str],
+    expected: List[tuple[int, Dict]],
+    received: List[tuple[int, Dict]],
+    expected_name: str,
+    received_name: str,
+    max_differences: int,
+) -> List[_Found]:
+    received_by_key: Dict[tuple, tuple[int, Dict]] = {}
+    for i2, row in received:
+        received_by_key.setdefault(tuple(row[c] for c in key_columns), (i2, row))
+
+    found, seen = [], set()
+    for i1, row in expected:
+        if len(found) >= max_differences:
+            return found
+        key = tuple(row[c] for c in key_columns)
+        seen.add(key)
+        match = received_by_key.get(key)
+        if match is None:
+            found.append(((0, i1, 0), f"{expected_name}[{i1}]", f"{short_repr.repr(row)} is not inside {received_name}"))
+            continue
+        i2, received_row = match
+        report = DiffReport(max_differences=max_differences - len(found))
+        diff_into(row, received_row, f"{expected_name}[{i1}]", f"{received_name}[{i2}]", report)
+        found.extend(((0, i1, n), d.path, d.message) for n, d in enumerate(report.differences))
+
+    for key, (i2, row) in received_by_key.items():
+        if key not in seen and len(found) < max_differences:
+            found.append(((1, i2, 0), f"{received_name}[{i2}]", f"{short_repr.repr(row)} was not expected"))
+    return found
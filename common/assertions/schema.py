@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+from .compare import ExpectedFieldMissingError, UnexpectedTypeError
+
+
+@dataclass(frozen=True)
+class ListOf:
+    """Expected structure of every element of a list."""
+
+    items: Any
+
+
+@dataclass(frozen=True)
+class FieldValidator:
+    """Compiled check of a value and, for dicts and lists, of what they contain.
+
+    Build it once with `compile_schema`, then apply it to any number of values.
+    """
+
+    path: str
+    types: tuple[type, ...]
+    nullable: bool
+    exact: bool = False
+    fields: tuple[tuple[Any, "FieldValidator"], ...] = ()
+    items: Optional["FieldValidator"] = None
+
+    def validate(self, value: Any) -> None:
+        if value is None:
+            if self.nullable:
+                return
+            raise UnexpectedTypeError(f"'Null' not allowed in {self.path}, only {list(self.types)}")
+        if (type(value) not in self.types) if self.exact else not isinstance(value, self.types):
+            raise UnexpectedTypeError(f"Expected {self.path} to be a {list(self.types)}, not {type(value)}")
+
+        for key, field in self.fields:
+            if key not in value:
+                raise ExpectedFieldMissingError(f"{field.path} is not in {self.path}")
+            field.validate(value[key])
+
+        if self.items is not None:
+            for index, item in enumerate(value):
+                try:
+                    self.items.validate(item)
+                except (UnexpectedTypeError, ExpectedFieldMissingError) as exc:
+                    raise type(exc)(f"{exc} (element {index} of {self.path})") from None
+
+    def validate_all(self, values: Iterable[Any]) -> None:
+        for value in values:
+            self.validate(value)
+
+
+def _split_nullable(expected: Any) -> tuple[list, bool]:
+    alternatives = expected if isinstance(expected, list) else [expected]
+    return [alternative for alternative in alternatives if alternative is not None], None in alternatives
+
+
+def compile_schema(expected: Any, *, where: str = "response", exact: bool = False) -> FieldValidator:
+    """Turn an expected structure into a reusable `FieldValidator`.
+
+    The structure is a type, a list of alternative types where None allows nulls,
+    a dict of field name to structure, or `ListOf(structure)`; dicts and ListOf can be
+    alternatives too (eg: `[{"id": int}, None]`). With `exact` subclasses don't match,
+    so a bool is not an int.
+    """
+    alternatives, nullable = _split_nullable(expected)
+
+    nested = [alternative for alternative in alternatives if isinstance(alternative, (dict, ListOf))]
+    if len(nested) > 1 or (nested and len(alternatives) > 1):
+        raise ValueError(f"{where}: a dict or ListOf can only be an alternative to None")
+
+    if nested and isinstance(nested[0], dict):
+        fields = tuple(
+            (key, compile_schema(structure, where=f"{where}.{key}", exact=exact))
+            for key, structure in nested[0].items()
+        )
+        return FieldValidator(where, (dict,), nullable, fields=fields)
+    if nested:
+        items = compile_schema(nested[0].items, where=f"{where}[]", exact=exact)
+        return FieldValidator(where, (list, tuple), nullable, items=items)
+
+    if not all(isinstance(alternative, type) for alternative in alternatives):
+        raise TypeError(f"{where}: expected types, not {alternatives}")
+    return FieldValidator(where, tuple(alternatives), nullable, exact=exact)
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from itertools import zip_longest
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from .diff import DiffReport, diff_into, short_repr, values_equal
+from .matching import DEFAULT_MAX_DIFFERENCES
+
+
+DEFAULT_STREAM_WINDOW = 1_000
+
+_END = object()
+
+
+def compare_streams(
+    expected: Iterable[Any],
+    received: Iterable[Any],
+    *,
+    key_columns: Optional[str | List[str]] = None,
+    window: int = DEFAULT_STREAM_WINDOW,
+    expected_name: str = "expected",
+    received_name: str = "received",
+    max_differences: int = DEFAULT_MAX_DIFFERENCES,
+) -> DiffReport:
+    """Compare two iterables element by element without loading them, as `diff` would.
+
+    Without `key_columns` they're read in lockstep: elements may be out of order by up
+    to `window` positions, and an element with no match within the window is reported.
+    With `key_columns` both must be sorted by them and are merge joined, any distance
+    apart. Only the window, or the current rows, and the report are kept in memory.
+    Stops reading after `max_differences`.
+    """
+    report = DiffReport(max_differences=max_differences)
+    if key_columns is None:
+        _compare_lockstep(iter(expected), iter(received), window, expected_name, received_name, report)
+    else:
+        columns = [key_columns] if isinstance(key_columns, str) else key_columns
+        _compare_merge_join(
+            iter(expected), iter(received), lambda row: tuple(row[c] for c in columns),
+            expected_name, received_name, report,
+        )
+    return report
+
+
+def assert_equal_streams(
+    expected: Iterable[Any],
+    received: Iterable[Any],
+    *,
+    key_columns: Optional[str | List[str]] = None,
+    window: int = DEFAULT_STREAM_WINDOW,
+    expected_name: str = "expected",
+    received_name: str = "received",
+    max_differences: int = DEFAULT_MAX_DIFFERENCES,
+) -> None:
+    report = compare_streams(
+        expected, received, key_columns=key_columns, window=window,
+        expected_name=expected_name, received_name=received_name, max_differences=max_differences,
+    )
+    if report:
+        raise AssertionError(report.render(f"{expected_name} != {received_name}"))
+
+
+def _take_match(value: Any, pending: "OrderedDict[int, Any]", equal: Callable[[Any, Any], bool]) -> bool:
+    for index, other in pending.items():
+        if equal(value, other):
+            del pending[index]
+            return True
+    return False
+
+
+def _compare_lockstep(
+    expected: Iterator, received: Iterator, window: int, expected_name: str, received_name: str, report: DiffReport
+) -> None:
+    pending_expected: OrderedDict[int, Any] = OrderedDict()
+    pending_received: OrderedDict[int, Any] = OrderedDict()
+
+    def _evict(limit: int) -> None:
+        while len(pending_expected) > limit or len(pending_received) > limit:
+            oldest_expected = next(iter(pending_expected), None)
+            oldest_received = next(iter(pending_received), None)
+            if oldest_expected is not None and oldest_expected == oldest_received:
+                # same position on both sides and no match nearby: most likely the same element, changed
+                diff_into(
+                    pending_expected.pop(oldest_expected), pending_received.pop(oldest_received),
+                    f"{expected_name}[{oldest_expected}]", f"{received_name}[{oldest_received}]", report,
+                )
+            elif oldest_received is None or (oldest_expected is not None and oldest_expected < oldest_received):
+                value = pending_expected.pop(oldest_expected)
+                report.add(f"{expected_name}[{oldest_expected}]", f"{short_repr.repr(value)} is not inside {received_name}")
+            else:
+                value = pending_received.pop(oldest_received)
+                report.add(f"{received_name}[{oldest_received}]", f"{short_repr.repr(value)} was not expected")
+
+    for index, (expected_value, received_value) in enumerate(zip_longest(expected, received, fillvalue=_END)):
+        if not pending_expected and not pending_received and expected_value is not _END and received_value is not _END:
+            if values_equal(expected_value, received_value):
+                continue
+        if expected_value is not _END and not _take_match(expected_value, pending_received, values_equal):
+            pending_expected[index] = expected_value
+        if received_value is not _END and not _take_match(received_value, pending_expected, lambda r, e: values_equal(e, r)):
+            pending_received[index] = received_value
+        _evict(window)
+        if report.full:
+            return
+    _evict(0)
+
+
+def _compare_merge_join(
+    expected: Iterator,
+    received: Iterator,
+    key: Callable[[Any], tuple],
+    expected_name: str,
+    received_name: str,
+    report: DiffReport,
+) -> None:
+    def _advance(rows: Iterator, name: str, previous: Optional[tuple]) -> tuple[Any, Optional[tuple]]:
+        row = next(rows, _END)
+        if row is _END:
+            return _END, None
+        row_key = key(row)
+        if previous is not None and row_key < previous:
+            raise ValueError(f"{name} is not sorted by key: {row_key} after {previous}")
+        return row, row_key
+
+    expected_row, expected_key = _advance(expected, expected_name, None)
+    received_row, received_key = _advance(received, received_name, None)
+    while (expected_row is not _END or received_row is not _END) and not report.full:
+        if received_row is _END or (expected_row is not _END and expected_key < received_key):
+            report.add(f"{expected_name}{list(expected_key)}", f"{short_repr.repr(expected_row)} is not inside {received_name}")
+            expected_row, expected_key = _advance(expected, expected_name, expected_key)
+        elif expected_row is _END or received_key < expected_key:
+            report.add(f"{received_name}{list(received_key)}", f"{short_repr.repr(received_row)} was not expected")
+            received_row, received_key = _advance(received, received_name, received_key)
+        else:
+            diff_into(expected_row, received_row, f"{expected_name}{list(expected_key)}", f"{received_name}{list(received_key)}", report)
+            expected_row, expected_key = _advance(expected, expected_name, expected_key)
+            received_row, received_key = _advance(received, received_name, received_key)
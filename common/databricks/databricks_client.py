@@ -51,7 +51,7 @@ class DatabricksClient:
         self.databricks_token_provider: DatabricksTokenProvider = (
             databricks_token_provider
         )
-        self.token_value: str = self.databricks_token_provider.get_token()
+        self.token_value, self.token_generation = self.databricks_token_provider.get_token_with_generation()
 
         self.client: WorkspaceClient | None = None
         self._job_ids = self._get_job_ids()
@@ -59,8 +59,9 @@ class DatabricksClient:
         self.job_complete_time_out = job_complete_time_out
 
     def _get_databricks_client(self) -> WorkspaceClient:
-        if self.client is None or self.databricks_token_provider.is_expiring():
-            self.token_value = self.databricks_token_provider.get_token()
+        token_value, token_generation = self.databricks_token_provider.get_token_with_generation()
+        if self.client is None or token_generation != self.token_generation:
+            self.token_value, self.token_generation = token_value, token_generation
             self.client = WorkspaceClient(
                 host=self.databricks_hostname, token=self.token_value
             )
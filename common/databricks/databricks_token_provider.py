@@ -1,6 +1,9 @@
 import os
+import threading
 from datetime import datetime, timezone
-from typing import Callable
+from typing import Callable, Optional
+
+from .token_file_cache import DEFAULT_TOKEN_CACHE_DIR, TokenFileCache
 
 
 def get_current_time() -> datetime:
@@ -15,12 +18,37 @@ def get_token_for(resource_id: str) -> str:
 
 
 class DatabricksTokenProvider:
+    """Access tokens: the initial one, or in pipelines one from the Azure CLI, renewed hourly.
+
+    Pipeline tokens are cached per process and, unless `token_cache_dir` is None, in a
+    file shared by the local processes so only one of them runs the CLI. With
+    `background_refresh` a daemon thread renews the token REFRESH_AFTER_MINS after it was
+    generated, so callers get the cached one without waiting; they only fetch it
+    themselves when it's missing or expired. Refreshes are single flight: concurrent
+    callers wait for the one in progress, and each new token bumps `generation` so
+    clients know when to reconnect.
+    """
+
     EXPIRE_AFTER_MINS: int = 57
+    REFRESH_AFTER_MINS: int = 50
+    REFRESH_RETRY_SECS: int = 30
 
     _generated_at: datetime = None
 
     _cached_token_value: str = None
 
+    _refresher: Optional[threading.Thread] = None
+
+    _stop_refresher: threading.Event = threading.Event()
+
+    _refresher_lock = threading.Lock()
+
+    _refresh_lock = threading.Lock()
+
+    _generation: int = 0
+
+    _current: tuple[str, int] = (None, 0)
+
     def __init__(
         self,
         initial_token: str,
@@ -28,12 +56,18 @@ class DatabricksTokenProvider:
         pipeline_execution: bool,
         pipeline_token_retriever: Callable[[str], str] = get_token_for,
         current_time_generator: Callable[[], datetime] = get_current_time,
+        background_refresh: bool = True,
+        token_cache_dir: Optional[str] = DEFAULT_TOKEN_CACHE_DIR,
     ):
         self._initial_token = initial_token
         self._databricks_resource_id: str = databricks_resource_id
         self._pipeline_execution: bool = pipeline_execution
         self._pipeline_token_retriever: Callable[[str], str] = pipeline_token_retriever
         self._current_time_generator = current_time_generator
+        self._background_refresh = background_refresh
+        self._token_cache: Optional[TokenFileCache] = (
+            TokenFileCache(databricks_resource_id, token_cache_dir) if token_cache_dir is not None else None
+        )
 
     @classmethod
     def _set_cached_token(cls, token_value: str):
@@ -51,21 +85,114 @@ class DatabricksTokenProvider:
     def _get_generated_at(cls) -> datetime:
         return cls._generated_at
 
+    @classmethod
+    def _store_token(cls, token_value: str, generated_at: datetime) -> None:
+        cls._set_cached_token(token_value)
+        cls._set_generated_at(generated_at)
+        cls._generation += 1
+        cls._current = (token_value, cls._generation)
+
+    @classmethod
+    def generation(cls) -> int:
+        """Bumped every time a new token is stored, 0 until the first one."""
+        return cls._generation
+
+    def _token_age_mins(self) -> float:
+        return (self._current_time_generator() - self._get_generated_at()).total_seconds() / 60.0
+
     def is_expiring(self) -> bool:
         if self._pipeline_execution:
-            minutes_diff = (get_current_time() - self._get_generated_at()).total_seconds() / 60.0
-            return minutes_diff > self.EXPIRE_AFTER_MINS
+            return self._get_generated_at() is None or self._token_age_mins() > self.EXPIRE_AFTER_MINS
         else:
             return False
 
     def get_token(self) -> str:
-        if self._pipeline_execution:
-            if self._get_generated_at() is None or self.is_expiring():
-                self._set_cached_token(
-                    self._pipeline_token_retriever(self._databricks_resource_id)
-                )
-                self._set_generated_at(self._current_time_generator())
+        return self.get_token_with_generation()[0]
 
-            return self._get_cached_token()
+    def get_token_with_generation(self) -> tuple[str, int]:
+        """A valid token and its generation, read together so they match."""
+        if self._pipeline_execution:
+            if self.is_expiring():
+                with DatabricksTokenProvider._refresh_lock:
+                    # whoever held the lock may have refreshed it already
+                    if self.is_expiring():
+                        self._refresh()
+            if self._background_refresh:
+                self.start_background_refresh()
+
+            return self._current
         else:
-            return self._initial_token  # usually a Personal Access Token (PAT)
+            return self._initial_token, 0  # usually a Personal Access Token (PAT)
+
+    def _refresh(self) -> None:
+        """Fetch a new token. Must hold `_refresh_lock`."""
+        if self._token_cache is None:
+            token_value = self._fetch_token()
+            self._store_token(token_value, self._current_time_generator())
+            return
+
+        if self._use_shared_token():
+            return
+        with self._token_cache.refresh_lock():
+            # another process may have refreshed it while this one waited for the lock
+            if self._use_shared_token():
+                return
+            token_value = self._fetch_token()
+            generated_at = self._current_time_generator()
+            self._token_cache.write(token_value, generated_at)
+            self._store_token(token_value, generated_at)
+
+    def _fetch_token(self) -> str:
+        """A new token from the retriever. Raises rather than caching an empty one, so the refresh is retried."""
+        token_value = self._pipeline_token_retriever(self._databricks_resource_id)
+        if not token_value:
+            raise RuntimeError(f"No access token returned for {self._databricks_resource_id}, is the Azure CLI logged in?")
+        return token_value
+
+    def _use_shared_token(self) -> bool:
+        """Take the token from the file if it's newer than this process's one and not due for refresh."""
+        shared = self._token_cache.read()
+        if shared is None:
+            return False
+        token_value, generated_at = shared
+        current = self._get_generated_at()
+        age_mins = (self._current_time_generator() - generated_at).total_seconds() / 60.0
+        if (current is not None and generated_at <= current) or age_mins >= self.REFRESH_AFTER_MINS:
+            return False
+        self._store_token(token_value, generated_at)
+        return True
+
+    def start_background_refresh(self) -> None:
+        """Start the process wide refresher thread, if not running yet."""
+        cls = DatabricksTokenProvider
+        with cls._refresher_lock:
+            if cls._refresher is not None and cls._refresher.is_alive():
+                return
+            cls._stop_refresher = threading.Event()
+            cls._refresher = threading.Thread(
+                target=self._refresh_ahead, args=(cls._stop_refresher,), name="DatabricksTokenRefresher", daemon=True
+            )
+            cls._refresher.start()
+
+    @classmethod
+    def stop_background_refresh(cls) -> None:
+        with cls._refresher_lock:
+            refresher, cls._refresher = cls._refresher, None
+            cls._stop_refresher.set()
+        if refresher is not None and refresher is not threading.current_thread():
+            refresher.join()
+
+    def _refresh_ahead(self, stop: threading.Event) -> None:
+        while True:
+            wait_secs = 0.0
+            if self._get_generated_at() is not None:
+                wait_secs = max(0.0, (self.REFRESH_AFTER_MINS - self._token_age_mins()) * 60)
+            if stop.wait(wait_secs):
+                return
+            try:
+                with DatabricksTokenProvider._refresh_lock:
+                    self._refresh()
+            except Exception:
+                # callers still have the cached token, or fetch one themselves once it expires
+                if stop.wait(self.REFRESH_RETRY_SECS):
+                    return
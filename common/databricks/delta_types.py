@@ -0,0 +1,79 @@
+import dataclasses
+import types
+import typing
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+from typing import Any
+
+
+# Checked in order, so subclasses (bool of int, datetime of date) come first
+PYTHON_TO_DELTA_TYPES: tuple[tuple[type, str], ...] = (
+    (bool, "BOOLEAN"),
+    (int, "LONG"),
+    (float, "DOUBLE"),
+    (Decimal, "DECIMAL(16,6)"),
+    (str, "STRING"),
+    (bytes, "BINARY"),
+    (bytearray, "BINARY"),
+    (datetime, "TIMESTAMP"),
+    (date, "DATE"),
+    (dict, "STRING"),
+    (list, "ARRAY<STRING>"),
+    (tuple, "ARRAY<STRING>"),
+    (set, "ARRAY<STRING>"),
+    (frozenset, "ARRAY<STRING>"),
+)
+DEFAULT_DELTA_TYPE = "STRING"
+
+
+def _delta_type_of_class(cls: type) -> str | None:
+    if issubclass(cls, Enum):
+        return DEFAULT_DELTA_TYPE
+    if dataclasses.is_dataclass(cls):
+        # stored as a map of its fields
+        return DEFAULT_DELTA_TYPE
+    for python_type, delta_type in PYTHON_TO_DELTA_TYPES:
+        if issubclass(cls, python_type):
+            return delta_type
+    return None
+
+
+def delta_type(annotation: Any, default: Any = dataclasses.MISSING) -> str:
+    """Delta column type for a type annotation, falling back to the type of `default`."""
+    origin = typing.get_origin(annotation)
+
+    if origin is typing.Union or origin is types.UnionType:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return delta_type(args[0], default) if len(args) == 1 else DEFAULT_DELTA_TYPE
+    if origin is typing.Literal:
+        return delta_type(type(typing.get_args(annotation)[0]))
+    if origin is not None:
+        # list[int], dict[str, Any], ...
+        annotation = origin
+
+    if isinstance(annotation, type):
+        inferred = _delta_type_of_class(annotation)
+        if inferred is not None:
+            return inferred
+
+    if default is not dataclasses.MISSING and default is not None:
+        return _delta_type_of_class(type(default)) or DEFAULT_DELTA_TYPE
+    return DEFAULT_DELTA_TYPE
+
+
+@lru_cache(maxsize=None)
+def dataclass_schema(data_cls: type) -> dict[str, str]:
+    """Delta column types of a dataclass, from its field annotations. Cached per class, don't mutate it."""
+    hints = typing.get_type_hints(data_cls)
+    schema = {}
+    for field in dataclasses.fields(data_cls):
+        if field.default is not dataclasses.MISSING:
+            default = field.default
+        elif field.default_factory is not dataclasses.MISSING:
+            default = field.default_factory()
+        else:
+            default = dataclasses.MISSING
+        schema[field.name] = delta_type(hints.get(field.name, Any), default)
+    return schema
@@ -0,0 +1,296 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional
+
+from .query_manager import MAX_STATEMENT_CHARS, QueryManager
+from .staging import copy_to_directory, is_volume_path
+
+
+SHARED_MEMORY_DATABASE = "file:query_manager?mode=memory&cache=shared"
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'", re.DOTALL)
+_TABLE_REFERENCE = re.compile(
+    r"\b(FROM|JOIN|INTO|UPDATE|TABLE|VIEW|EXISTS)(\s+)(?!(?:IF|SET)\b)(`?\w+`?(?:\.`?\w+`?){1,2})(?![\w.`])",
+    re.IGNORECASE,
+)
+_COMPLEX_TYPE = re.compile(r"\b(?:ARRAY|MAP|STRUCT)<[^<>]*>", re.IGNORECASE)
+_TABLE_PROVIDER = re.compile(r"\s+USING\s+(?:delta|parquet|csv|json)\b", re.IGNORECASE)
+_TABLE_LOCATION = re.compile(r"\s+LOCATION\s+'[^']*'", re.IGNORECASE)
+_CREATE_DATABASE = re.compile(r"^\s*CREATE\s+(?:DATABASE|SCHEMA)\b", re.IGNORECASE)
+_DROP_DATABASE = re.compile(
+    r"^\s*DROP\s+(?:DATABASE|SCHEMA)(?:\s+IF\s+EXISTS)?\s+([`\w.]+)", re.IGNORECASE
+)
+_TRUNCATE_TABLE = re.compile(r"^\s*TRUNCATE\s+TABLE\b", re.IGNORECASE)
+_COPY_INTO = re.compile(
+    r"^\s*COPY\s+INTO\s+([`\w.]+)\s+FROM\s+'([^']*)'.*?\bFILES\s*=\s*\(\s*'([^']*)'",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _safe_converter(convert):
+    def _convert(value: bytes):
+        try:
+            return convert(value.decode())
+        except ValueError:
+            return value.decode()
+
+    return _convert
+
+
+sqlite3.register_converter("TIMESTAMP", _safe_converter(datetime.fromisoformat))
+sqlite3.register_converter("DATE", _safe_converter(date.fromisoformat))
+sqlite3.register_converter("DECIMAL", _safe_converter(Decimal))
+sqlite3.register_converter("BOOLEAN", _safe_converter(lambda value: value not in ("0", "")))
+
+
+class LocalRow(dict):
+    """A row that behaves like a databricks-sql Row, for the code written against it."""
+
+    def asDict(self) -> dict:  # noqa: N802
+        return dict(self)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError as exc:
+            raise AttributeError(name) from exc
+
+
+def _local_row(cursor: sqlite3.Cursor, row: tuple) -> LocalRow:
+    return LocalRow(zip([column[0] for column in cursor.description], row))
+
+
+def local_table_name(name: str) -> str:
+    """'catalog.db.table' and 'db.table' are both stored as the table "db.table", catalogs are ignored."""
+    parts = [part.strip("`") for part in name.split(".")]
+    return '"' + ".".join(parts[-2:]) + '"'
+
+
+def _to_sqlite(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value, default=str)
+    return value
+
+
+class LocalQueryManager(QueryManager):
+    """QueryManager on an embedded SQLite database, to run and profile without a SQL warehouse.
+
+    Spark SQL is translated just enough for the statements QueryManager builds:
+    catalogs are ignored, each 'db.table' is a table named "db.table", complex
+    columns are stored as JSON text and Delta clauses (USING, LOCATION) are dropped.
+    By default all instances in a process share one database in memory.
+    """
+
+    _keep_alive: dict[str, sqlite3.Connection] = {}
+    _keep_alive_lock = threading.Lock()
+
+    def _database(self) -> tuple[str, bool]:
+        path = self.config.local_database_path if self.config is not None else None
+        return (path, False) if path else (SHARED_MEMORY_DATABASE, True)
+
+    def _get_connection(self, force_new_connection: bool = False) -> sqlite3.Connection:
+        if self._connection is None or force_new_connection:
+            if self._connection is not None:
+                self._connection.close()
+            database, uri = self._database()
+            if uri:
+                # a shared database in memory only lives while a connection to it is open
+                with LocalQueryManager._keep_alive_lock:
+                    if database not in LocalQueryManager._keep_alive:
+                        LocalQueryManager._keep_alive[database] = sqlite3.connect(
+                            database, uri=True, check_same_thread=False
+                        )
+            self._connection = sqlite3.connect(
+                database,
+                uri=uri,
+                check_same_thread=False,
+                isolation_level=None,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                timeout=30,
+            )
+            self._connection.row_factory = _local_row
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _execute(self, query: str, fetch: bool) -> list[LocalRow]:
+        statement = self._translate(query)
+        if statement is None:
+            return []
+        cursor = self._get_connection().cursor()
+        try:
+            cursor.execute(statement)
+            return cursor.fetchall() if fetch else []
+        finally:
+            cursor.close()
+
+    def _translate(self, query: str) -> Optional[str]:
+        """Spark SQL to SQLite. Statements without an equivalent are run here and return None."""
+        if _CREATE_DATABASE.match(query):
+            return None
+        if match := _DROP_DATABASE.match(query):
+            self._drop_local_database(match.group(1))
+            return None
+        if match := _COPY_INTO.match(query):
+            self._copy_into(match.group(1), os.path.join(match.group(2), match.group(3)))
+            return None
+
+        query = _TABLE_LOCATION.sub("", _TABLE_PROVIDER.sub("", query))
+        query = _TRUNCATE_TABLE.sub("DELETE FROM", query)
+
+        translated, position = [], 0
+        for literal in _STRING_LITERAL.finditer(query):
+            translated.append(self._translate_code(query[position:literal.start()]))
+            translated.append("'" + literal.group(0)[1:-1].replace("\\'", "''") + "'")
+            position = literal.end()
+        translated.append(self._translate_code(query[position:]))
+        return "".join(translated)
+
+    @staticmethod
+    def _translate_code(code: str) -> str:
+        code = _TABLE_REFERENCE.sub(
+            lambda m: m.group(1) + m.group(2) + local_table_name(m.group(3)), code
+        )
+        while True:
+            replaced = _COMPLEX_TYPE.sub("TEXT", code)
+            if replaced == code:
+                return code
+            code = replaced
+
+    def _transform(self, value):
+        if isinstance(value, (list, dict)) or is_dataclass(value):
+            value = json.dumps(asdict(value) if is_dataclass(value) else value, default=str)
+        if isinstance(value, str):
+            escaped = value.replace("'", "''")
+            return f"'{escaped}'"
+        return super()._transform(value)
+
+    def upsert_records(
+        self,
+        database: str,
+        table: str,
+        records: list,
+        key_columns: list[str],
+        staged: bool = False,
+        max_statement_chars: int = MAX_STATEMENT_CHARS,
+    ) -> None:
+        """Upserts with INSERT ... ON CONFLICT, which needs a unique index on the key columns.
+
+        The rows are always inlined, parquet files can't be read from SQL here.
+        """
+        if not records:
+            return
+        name = local_table_name(f"{database}.{table}")
+        index = '"' + "_".join(["upsert", name.strip('"'), *key_columns]) + '"'
+        self._run(f"CREATE UNIQUE INDEX IF NOT EXISTS {index} ON {name} ({', '.join(key_columns)})", fetch=False)
+        super().upsert_records(database, table, records, key_columns, False, max_statement_chars)
+
+    def _merge_sql(
+        self,
+        database: str,
+        table: str,
+        columns: list[str],
+        key_columns: list[str],
+        values: Optional[list[str]] = None,
+        source: Optional[str] = None,
+    ) -> str:
+        if source is not None:
+            raise ValueError("Only VALUES sources are supported locally")
+        updated = [c for c in columns if c not in key_columns]
+        if updated:
+            on_conflict = (
+                f"DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in updated)} "
+                f"WHERE NOT ({' AND '.join(f'{c} IS excluded.{c}' for c in updated)})"
+            )
+        else:
+            on_conflict = "DO NOTHING"
+        return (
+            f"INSERT INTO {database}.{table} ({', '.join(columns)}) VALUES {', '.join(values)} "
+            f"ON CONFLICT ({', '.join(key_columns)}) {on_conflict}"
+        )
+
+    def _local_tables(self) -> list[str]:
+        rows = self._get_connection().execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view')"
+        ).fetchall()
+        return [row["name"] for row in rows]
+
+    def _staging_location(self) -> str:
+        """A local directory, staged files are copied to it."""
+        location = self.config.staging_location
+        if not location:
+            raise ValueError("QueryManagerConfig.staging_location must be set for staged loads")
+        if is_volume_path(location):
+            raise ValueError(f"Volumes are not available locally, use a local directory as staging_location, got '{location}'")
+        return location.rstrip("/")
+
+    def _upload_staged_file(self, local_file: str) -> tuple[str, str]:
+        location = self._staging_location()
+        copy_to_directory(local_file, location)
+        return location, os.path.basename(local_file)
+
+    def _remove_staged_file(self, staged_file: str) -> None:
+        if os.path.exists(staged_file):
+            os.remove(staged_file)
+
+    def _drop_local_database(self, database: str) -> None:
+        prefix = database.strip("`").split(".")[-1].lower() + "."
+        for name in self._local_tables():
+            if name.lower().startswith(prefix):
+                self._get_connection().execute(f'DROP TABLE IF EXISTS "{name}"')
+
+    def _copy_into(self, table: str, file_path: str) -> None:
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(file_path)
+        columns = parquet_file.schema_arrow.names
+        statement = (
+            f"INSERT INTO {local_table_name(table)} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        connection = self._get_connection()
+        connection.execute("BEGIN")
+        try:
+            for batch in parquet_file.iter_batches():
+                connection.executemany(
+                    statement,
+                    ([_to_sqlite(row[c]) for c in columns] for row in batch.to_pylist()),
+                )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _fetch_table_names(self, database: str) -> set[str]:
+        prefix = database.strip("`").split(".")[-1].lower() + "."
+        return {
+            name[len(prefix):]
+            for name in self._local_tables()
+            if name.lower().startswith(prefix)
+        }
+
+    def catalog_exists(self, catalog: str) -> bool:
+        """Catalogs are ignored locally, so any of them exists."""
+        return True
+
+    def preload_table_metadata(self, catalog: str) -> None:
+        tables_by_database: dict[str, list[str]] = {}
+        for name in self._local_tables():
+            database, _, table = name.rpartition(".")
+            if database:
+                tables_by_database.setdefault(database, []).append(table)
+        for database, table_names in tables_by_database.items():
+            self.metadata_cache.set_tables(f"{catalog}.{database}", table_names)
@@ -0,0 +1,98 @@
+import re
+import threading
+from time import monotonic
+from typing import Callable, Iterable, Optional
+
+from .sql_names import IDENTIFIER, normalize_name, same_object
+
+
+DEFAULT_METADATA_TTL_SECS: float = 10 * 60
+
+_TABLE_DDL = re.compile(
+    rf"\b(?:CREATE(?:\s+OR\s+REPLACE)?(?:\s+(?:GLOBAL\s+)?TEMP(?:ORARY)?)?|DROP|ALTER)\s+(?:TABLE|VIEW)"
+    rf"(?:\s+IF\s+(?:NOT\s+)?EXISTS)?\s+({IDENTIFIER})",
+    re.IGNORECASE,
+)
+
+
+def changed_table_databases(query: str) -> set[tuple[str, ...]]:
+    """Databases whose list of tables may be changed by a DDL statement."""
+    return {normalize_name(name)[:-1] for name in _TABLE_DDL.findall(query)}
+
+
+class MetadataCache:
+    """Thread safe cache of the tables in each database and of the existing catalogs.
+
+    Each database is loaded as a whole and expires after `ttl_secs`.
+    Databases are keyed as given, so 'db' and 'catalog.db' are loaded separately.
+    """
+
+    def __init__(
+        self,
+        ttl_secs: float = DEFAULT_METADATA_TTL_SECS,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.ttl_secs = ttl_secs
+        self._clock = clock
+        self._tables: dict[tuple[str, ...], tuple[set[str], float]] = {}
+        self._catalogs: Optional[tuple[set[str], float]] = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, loaded_at: float) -> bool:
+        return self._clock() - loaded_at <= self.ttl_secs
+
+    def tables(self, database: str) -> Optional[set[str]]:
+        """Table and view names of `database`, or None if not loaded or expired."""
+        with self._lock:
+            entry = self._tables.get(normalize_name(database))
+            if entry is None or not self._is_fresh(entry[1]):
+                return None
+            return entry[0]
+
+    def set_tables(self, database: str, table_names: Iterable[str]) -> None:
+        with self._lock:
+            self._tables[normalize_name(database)] = (
+                {name.lower() for name in table_names},
+                self._clock(),
+            )
+
+    def add_table(self, database: str, table_name: str) -> None:
+        """Record a new table in every loaded entry of `database`."""
+        target = normalize_name(database)
+        with self._lock:
+            for key, (names, _) in self._tables.items():
+                if same_object(key, target):
+                    names.add(table_name.lower())
+
+    def remove_database(self, database: str) -> None:
+        """Record that `database` no longer has any tables."""
+        target = normalize_name(database)
+        with self._lock:
+            for key in [key for key in self._tables if same_object(key, target)]:
+                self._tables[key] = (set(), self._clock())
+            self._tables.setdefault(target, (set(), self._clock()))
+
+    def forget_database(self, database: tuple[str, ...] | str) -> None:
+        """Reload `database` on next use. A table name without database forgets all of them."""
+        target = normalize_name(database) if isinstance(database, str) else database
+        with self._lock:
+            if not target:
+                self._tables.clear()
+                return
+            for key in [key for key in self._tables if same_object(key, target)]:
+                del self._tables[key]
+
+    def catalogs(self) -> Optional[set[str]]:
+        with self._lock:
+            if self._catalogs is None or not self._is_fresh(self._catalogs[1]):
+                return None
+            return self._catalogs[0]
+
+    def set_catalogs(self, catalog_names: Iterable[str]) -> None:
+        with self._lock:
+            self._catalogs = ({name.lower() for name in catalog_names}, self._clock())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tables.clear()
+            self._catalogs = None
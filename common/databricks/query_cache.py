@@ -0,0 +1,157 @@
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Callable
+
+from .sql_names import IDENTIFIER, normalize_name, same_object
+
+
+DEFAULT_CACHE_TTL_SECS: float = 5 * 60
+DEFAULT_CACHE_MAX_ENTRIES: int = 256
+
+_WHITESPACE = re.compile(r"\s+")
+# string literals and quoted identifiers, kept as they are when normalizing
+_QUOTED = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""", re.DOTALL)
+# a comma separated FROM list, with aliases
+_READ_REFERENCES = re.compile(
+    rf"\b(?:FROM|JOIN)\s+({IDENTIFIER}(?:(?:\s+(?:AS\s+)?\w+)?\s*,\s*{IDENTIFIER})*)", re.IGNORECASE
+)
+_LEADING_NAME = re.compile(rf"\s*({IDENTIFIER})")
+_WRITE_REFERENCES = re.compile(
+    rf"\b(?:INSERT\s+(?:INTO|OVERWRITE)(?:\s+TABLE)?|DELETE\s+FROM|UPDATE|MERGE\s+INTO|COPY\s+INTO"
+    rf"|TRUNCATE\s+TABLE|DROP\s+(?:TABLE|VIEW)(?:\s+IF\s+EXISTS)?"
+    rf"|ALTER\s+(?:TABLE|VIEW)|CREATE\s+OR\s+REPLACE\s+(?:TABLE|VIEW))\s+({IDENTIFIER})",
+    re.IGNORECASE,
+)
+_DROP_DATABASE = re.compile(
+    rf"\bDROP\s+(?:DATABASE|SCHEMA)(?:\s+IF\s+EXISTS)?\s+({IDENTIFIER})", re.IGNORECASE
+)
+
+
+def normalize_sql(query: str) -> str:
+    """Collapse whitespace outside of quotes and drop the trailing semicolon, so equivalent queries share a cache key."""
+    parts = _QUOTED.split(query)
+    # split() puts the quoted parts at the odd positions
+    parts[::2] = [_WHITESPACE.sub(" ", part) for part in parts[::2]]
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def referenced_tables(query: str) -> set[tuple[str, ...]]:
+    """Tables read by a query, as lowercase name parts."""
+    return {
+        normalize_name(_LEADING_NAME.match(item).group(1))
+        for table_list in _READ_REFERENCES.findall(query)
+        for item in table_list.split(",")
+    }
+
+
+def written_tables(query: str) -> set[tuple[str, ...]]:
+    """Tables changed by a statement, as lowercase name parts."""
+    return {normalize_name(name) for name in _WRITE_REFERENCES.findall(query)}
+
+
+def dropped_databases(query: str) -> set[tuple[str, ...]]:
+    """Databases removed by a statement, as lowercase name parts."""
+    return {normalize_name(name) for name in _DROP_DATABASE.findall(query)}
+
+
+@dataclass
+class CacheEntry:
+    rows: list[dict]
+    tables: set[tuple[str, ...]]
+    stored_at: float = field(default_factory=monotonic)
+
+
+class QueryResultCache:
+    """Thread safe LRU cache of query results, keyed by normalized SQL.
+
+    Entries expire after `ttl_secs` and the least recently used ones are evicted
+    once `max_entries` is reached. Writes to a table drop every entry that reads from it.
+    """
+
+    def __init__(
+        self,
+        ttl_secs: float = DEFAULT_CACHE_TTL_SECS,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.ttl_secs = ttl_secs
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        # bumped on every invalidation, so results read before a write are not stored after it
+        self.generation: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, query: str) -> list[dict] | None:
+        key = normalize_sql(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._clock() - entry.stored_at > self.ttl_secs:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(row) for row in entry.rows]
+
+    def put(self, query: str, rows: list[dict], generation: int | None = None) -> None:
+        """Store `rows`, unless the cache was invalidated since `generation` was read."""
+        if self.max_entries <= 0:
+            return
+        key = normalize_sql(query)
+        entry = CacheEntry(
+            rows=[dict(row) for row in rows],
+            tables=referenced_tables(key),
+            stored_at=self._clock(),
+        )
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_table(self, table: str) -> None:
+        """Drop entries reading from `table` ('table', 'db.table' or 'catalog.db.table')."""
+        self._invalidate(lambda name: same_object(name, normalize_name(table)))
+
+    def invalidate_database(self, database: str) -> None:
+        """Drop entries reading from any table inside `database` ('db' or 'catalog.db').
+
+        Unqualified table names may live in any database, so they are dropped too.
+        """
+        target = normalize_name(database)
+        self._invalidate(lambda name: len(name) == 1 or same_object(name[:-1], target))
+
+    def invalidate_for_statement(self, query: str) -> None:
+        """Drop entries made stale by a write statement, if it is one."""
+        for table in written_tables(query):
+            self._invalidate(lambda name, table=table: same_object(name, table))
+        for database in dropped_databases(query):
+            self.invalidate_database(".".join(database))
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def _invalidate(self, matches: Callable[[tuple[str, ...]], bool]) -> None:
+        with self._lock:
+            self.generation += 1
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if any(matches(name) for name in entry.tables)
+            ]
+            for key in stale:
+                del self._entries[key]
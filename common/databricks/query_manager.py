@@ -1,23 +1,51 @@
 import copy
-from dataclasses import asdict, dataclass, fields, is_dataclass
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields, is_dataclass
 from datetime import date, datetime
 from decimal import Decimal
-from logging import Logger
-from typing import Any, Optional
-
-from pyspark.sql import types as st
+from logging import DEBUG, ERROR, WARNING, Logger
+from time import perf_counter
+from typing import Any, Callable, Iterable, Optional
 
 import more_itertools
 from databricks import sql
 from databricks.sql.client import Connection, Row
 from databricks.sql.exc import DatabaseError, ServerOperationError
 
-from databricks_token_provider import DatabricksTokenProvider
-
-
-SERVER_OPERATION_ERROR_MESSAGES = {
-    "Table or view not found",
-    "TABLE_OR_VIEW_NOT_FOUND",
+from .databricks_token_provider import DatabricksTokenProvider
+from .delta_types import dataclass_schema
+from .metadata_cache import DEFAULT_METADATA_TTL_SECS, MetadataCache, changed_table_databases
+from .query_cache import DEFAULT_CACHE_MAX_ENTRIES, DEFAULT_CACHE_TTL_SECS, QueryResultCache
+from .query_profiler import QueryProfiler
+from .retry_policy import ErrorClass, RetryPolicy
+from .table_scan import DEFAULT_SCAN_PAGE_SIZE, TableScan
+from .table_watermark import TableSnapshot, snapshots_in
+from .staging import (
+    is_volume_path,
+    local_staging_dir,
+    new_staging_file_name,
+    record_as_dict,
+    write_parquet,
+)
+from .update_queue import (
+    DEFAULT_FLUSH_INTERVAL_SECS,
+    DEFAULT_FLUSH_SIZE,
+    DEFAULT_PUT_TIMEOUT_SECS,
+    UpdateQueue,
+    UpdateQueueError,
+    UpdateQueueResult,
+)
+
+
+INSERT_CHUNK_SIZE = 200
+MAX_STATEMENT_CHARS = 100_000
+
+DATABASE_NOT_FOUND_ERROR_MESSAGES = {
+    "SCHEMA_NOT_FOUND",
+    "Database not found",
+    "NO_SUCH_CATALOG_EXCEPTION",
 }
 
 
@@ -27,53 +55,164 @@ class QueryManagerConfig:
     http_path: str
     token_provider: DatabricksTokenProvider
     logger: Logger
+    result_cache_ttl_secs: float = DEFAULT_CACHE_TTL_SECS
+    result_cache_max_entries: int = DEFAULT_CACHE_MAX_ENTRIES
+    metadata_cache_ttl_secs: float = DEFAULT_METADATA_TTL_SECS
+    # record duration, rows and bytes of every query, for a rollup per scenario
+    profile_queries: bool = False
+    # log queries slower than this as warnings, also enables profiling
+    slow_query_secs: Optional[float] = None
+    retry_policy: RetryPolicy = field(default_factory=RetryPolicy)
+    update_queue_workers: int = 4
+    update_queue_retries: int = 2
+    # where staged appends upload their Parquet files: a '/Volumes/...' path, or a local directory with the local backend
+    staging_location: Optional[str] = None
+    # where staged appends write their Parquet files before uploading, defaults to a temp dir
+    staging_local_dir: Optional[str] = None
+    # "databricks", or "local" for the embedded SQLite backend
+    backend: str = "databricks"
+    # SQLite file for the local backend, defaults to a database in memory shared by the process
+    local_database_path: Optional[str] = None
 
 
 class QueryManager:
-    _update_queue: dict = {}
+    _update_queue: UpdateQueue = UpdateQueue()
 
-    def __init__(self, config: QueryManagerConfig = None):
+    def __init__(
+        self,
+        config: QueryManagerConfig = None,
+        result_cache: Optional[QueryResultCache] = None,
+        metadata_cache: Optional[MetadataCache] = None,
+        profiler: Optional[QueryProfiler] = None,
+    ):
         self.config = config
         self._connection: Optional[Connection] = None
+        self._token_generation: Optional[int] = None
+        self.result_cache: QueryResultCache = (
+            self._new_result_cache(config) if result_cache is None else result_cache
+        )
+        self.metadata_cache: MetadataCache = (
+            self._new_metadata_cache(config) if metadata_cache is None else metadata_cache
+        )
+        self.profiler: QueryProfiler = self._new_profiler(config) if profiler is None else profiler
+        self._flusher: Optional[QueryManager] = None
+
+    @staticmethod
+    def _new_result_cache(config: Optional[QueryManagerConfig]) -> QueryResultCache:
+        if config is None:
+            return QueryResultCache()
+        return QueryResultCache(
+            ttl_secs=config.result_cache_ttl_secs,
+            max_entries=config.result_cache_max_entries,
+        )
+
+    @staticmethod
+    def _new_metadata_cache(config: Optional[QueryManagerConfig]) -> MetadataCache:
+        if config is None:
+            return MetadataCache()
+        return MetadataCache(ttl_secs=config.metadata_cache_ttl_secs)
+
+    @staticmethod
+    def _new_profiler(config: Optional[QueryManagerConfig]) -> QueryProfiler:
+        if config is None:
+            return QueryProfiler()
+        return QueryProfiler(
+            enabled=config.profile_queries,
+            slow_query_secs=config.slow_query_secs,
+            logger=config.logger,
+        )
 
     def _get_connection(self, force_new_connection: bool = False) -> Connection:
+        token, token_generation = self.config.token_provider.get_token_with_generation()
         if (
             self._connection is None
-            or self.config.token_provider.is_expiring()
+            or token_generation != self._token_generation
             or force_new_connection
         ):
+            staging_kwargs = (
+                {"staging_allowed_local_path": local_staging_dir(self.config.staging_local_dir)}
+                if self.config.staging_location and is_volume_path(self.config.staging_location)
+                else {}
+            )
             self._connection = sql.connect(
                 server_hostname=self.config.hostname,
                 http_path=self.config.http_path,
-                access_token=self.config.token_provider.get_token(),
+                access_token=token,
+                **staging_kwargs,
             )
+            self._token_generation = token_generation
         return self._connection
 
-    def execute_update(self, query: str) -> None:
-        def _update_execution():
-            with self._get_connection().cursor() as cursor:
-                cursor.execute(query)
+    def _execute(self, query: str, fetch: bool) -> list[Row]:
+        with self._get_connection().cursor() as cursor:
+            cursor.execute(query)
+            if not fetch:
+                return []
+            try:
+                return cursor.fetchall()
+            except TypeError:
+                return []
+
+    def _run(self, query: str, fetch: bool) -> list[Row]:
+        """Execute a statement, retrying it as the retry policy says, and profile it."""
+        policy = self._retry_policy
+        started = perf_counter()
+        attempt, reconnect, reconnected = 0, False, False
+        while True:
+            attempt += 1
+            try:
+                if reconnect:
+                    self._get_connection(force_new_connection=True)
+                    reconnect, reconnected = False, True
+                rows = self._execute(query, fetch=fetch)
+                break
+            except Exception as exc:
+                error_class = policy.classify(exc)
+                if error_class is ErrorClass.FATAL or attempt >= policy.max_attempts:
+                    if self.profiler.enabled:
+                        self.profiler.record(query, perf_counter() - started, reconnected=reconnected, failed=True)
+                    raise
+                reconnect = reconnect or error_class is ErrorClass.RECONNECT
+                # a first reconnect is usually an expired session, no need to wait for it
+                delay = 0 if error_class is ErrorClass.RECONNECT and attempt == 1 else policy.delay(attempt)
+                self._log(
+                    f"Attempt {attempt} failed with a {error_class.value} error, retrying in {delay:.1f}s: {exc}",
+                    level=WARNING,
+                )
+                if delay:
+                    policy.sleep(delay)
+        if self.profiler.enabled:
+            self.profiler.record(query, perf_counter() - started, rows, reconnected=reconnected)
+        return rows
+
+    @property
+    def _retry_policy(self) -> RetryPolicy:
+        return self.config.retry_policy if self.config is not None else RetryPolicy()
 
+    def execute_update(self, query: str) -> None:
         try:
-            _update_execution()
-        except Exception:
-            self._get_connection(force_new_connection=True)
-            _update_execution()
+            self._run(query, fetch=False)
+        finally:
+            # even a failed statement may have changed some tables
+            self.result_cache.invalidate_for_statement(query)
+            for database in changed_table_databases(query):
+                self.metadata_cache.forget_database(database)
 
     def execute_query(self, query: str) -> list[Row]:
-        def _execution() -> list[Row]:
-            with self._get_connection().cursor() as cursor:
-                cursor.execute(query)
-                try:
-                    return cursor.fetchall()
-                except TypeError:
-                    return []
+        return self._run(query, fetch=True)
+
+    def _worker_query_manager(self) -> "QueryManager":
+        """A QueryManager with its own connection, sharing this one's caches."""
+        return type(self)(
+            config=self.config,
+            result_cache=self.result_cache,
+            metadata_cache=self.metadata_cache,
+            profiler=self.profiler,
+        )
 
-        try:
-            return _execution()
-        except Exception:
-            self._get_connection(force_new_connection=True)
-            return _execution()
+    def _log(self, message: str, level: int = DEBUG) -> None:
+        if self.config is not None and self.config.logger is not None:
+            self.config.logger.log(level, message)
 
     def close(self):
         try:
@@ -112,28 +251,50 @@ class QueryManager:
         return result
 
     def table_or_view_exists(self, database: str, table_name: str) -> bool:
-        query = f"DESCRIBE TABLE {database}.{table_name}"
+        """Answered from the metadata cache, loading all tables of `database` at once when needed.
+
+        A table missing from the cache is looked for again, it may have been created
+        since by something else than this QueryManager, eg: the job under test.
+        """
+        table_names = self.metadata_cache.tables(database)
+        if table_names is None or table_name.lower() not in table_names:
+            table_names = self._fetch_table_names(database)
+            self.metadata_cache.set_tables(database, table_names)
+        return table_name.lower() in table_names
+
+    def catalog_exists(self, catalog: str) -> bool:
+        """Answered from the metadata cache, loading all catalogs at once when needed."""
+        catalog_names = self.metadata_cache.catalogs()
+        if catalog_names is None:
+            catalog_names = self._fetch_catalog_names()
+            self.metadata_cache.set_catalogs(catalog_names)
+        return catalog.lower() in catalog_names
+
+    def preload_table_metadata(self, catalog: str) -> None:
+        """Load the tables of every database in `catalog` with a single query.
+
+        Only lookups made as 'catalog.database' benefit from it.
+        """
+        query = f"SELECT table_schema, table_name FROM {catalog}.information_schema.tables"
+        tables_by_database: dict[str, list[str]] = {}
+        for row in self.execute_query(query):
+            tables_by_database.setdefault(row.table_schema, []).append(row.table_name)
+        for database, table_names in tables_by_database.items():
+            self.metadata_cache.set_tables(f"{catalog}.{database}", table_names)
+
+    def _fetch_table_names(self, database: str) -> set[str]:
         try:
-            self.execute_update(query)
-            return True
+            rows = self.execute_query(f"SHOW TABLES IN {database}")
         except ServerOperationError as exc:
             if exc.message and any(
-                message in exc.message for message in SERVER_OPERATION_ERROR_MESSAGES
+                message in exc.message for message in DATABASE_NOT_FOUND_ERROR_MESSAGES
             ):
-                return False
+                return set()
             raise
+        return {row.tableName for row in rows}
 
-    def catalog_exists(self, catalog: str) -> bool:
-        query = f"DESCRIBE CATALOG {catalog}"
-        try:
-            self.execute_update(query)
-            return True
-        except ServerOperationError as error:
-            if error.message and any(
-                message in error.message for message in SERVER_OPERATION_ERROR_MESSAGES
-            ):
-                return False
-            raise
+    def _fetch_catalog_names(self) -> set[str]:
+        return {row[0] for row in self.execute_query("SHOW CATALOGS")}
 
     @classmethod
     def queue_for_update(
@@ -141,45 +302,285 @@ class QueryManager:
         database: str,
         table_name: str,
         records: list,
+        timeout: Optional[float] = DEFAULT_PUT_TIMEOUT_SECS,
     ) -> None:
-        cls._update_queue.setdefault(
-            f"{database}.{table_name}", []
-        ).extend(records)
-
-    def process_update_queue(self) -> None:
-        for (
-            db_table,
-            records_to_persist,
-        ) in QueryManager._update_queue.items():
+        """Queue records to be appended later, by `process_update_queue` or the auto flush.
+
+        Never runs SQL. If the queue is full, waits up to `timeout` seconds (None for no
+        limit) for the auto flush to make room, or raises `queue.Full`, at once if a
+        flush fails meanwhile.
+        """
+        cls._update_queue.put(f"{database}.{table_name}", records, timeout=timeout)
+
+    def process_update_queue(self, raise_on_failure: bool = True) -> UpdateQueueResult:
+        """Append every queued record, flushing the tables concurrently.
+
+        Each worker thread uses its own connection. A failing INSERT is retried up to
+        `update_queue_retries` times, resuming from the chunk that failed, unless the
+        retry policy classifies its error as fatal. Records of a
+        table that still fails are put back in the queue, and an `UpdateQueueError`
+        is raised after the other tables are written, unless `raise_on_failure` is False.
+        """
+        batch = QueryManager._update_queue.take()
+        result = UpdateQueueResult()
+        if not batch:
+            return result
+
+        try:
+            workers = min(self.config.update_queue_workers if self.config else 1, len(batch))
+            if workers <= 1:
+                outcomes = [self._flush_table(self, db_table, records) for db_table, records in batch.items()]
+            else:
+                outcomes = self._flush_tables_concurrently(batch, workers)
+        except BaseException as exc:
+            # taken records must always be given back, or their space in the queue is never released
+            QueryManager._update_queue.requeue(batch, error=exc)
+            raise
+
+        unwritten = {}
+        for (db_table, records), (written, exc) in zip(batch.items(), outcomes):
+            if exc is None:
+                result.add_success(db_table, written)
+            else:
+                result.add_failed(db_table, exc)
+                unwritten[db_table] = records[written:]
+                self._log(f"Failed to flush {db_table} after writing {written} of {len(records)} records: {exc}", level=ERROR)
+
+        QueryManager._update_queue.ack(
+            {db_table: records[:len(records) - len(unwritten.get(db_table, []))] for db_table, records in batch.items()}
+        )
+        error = UpdateQueueError(result) if unwritten else None
+        QueryManager._update_queue.requeue(unwritten, error=error)
+
+        if raise_on_failure and error is not None:
+            raise error
+        return result
+
+    def _flush_tables_concurrently(self, batch: dict[str, list], workers: int) -> list[tuple[int, Optional[Exception]]]:
+        local = threading.local()
+        query_managers: list[QueryManager] = []
+
+        def _flush(db_table: str, records: list) -> tuple[int, Optional[Exception]]:
+            if not hasattr(local, "query_manager"):
+                local.query_manager = self._worker_query_manager()
+                query_managers.append(local.query_manager)
+            return self._flush_table(local.query_manager, db_table, records)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="QueryManagerFlush") as executor:
+                futures = [executor.submit(_flush, db_table, records) for db_table, records in batch.items()]
+                return [future.result() for future in futures]
+        finally:
+            for query_manager in query_managers:
+                if query_manager._connection is not None:
+                    query_manager.close()
+
+    def _flush_table(self, query_manager: "QueryManager", db_table: str, records: list) -> tuple[int, Optional[Exception]]:
+        """Returns how many records were written and the error that stopped the rest, if any."""
+        try:
             database, table_name = db_table.split(".")
-            self.append_to_table(database, table_name, records_to_persist)
-        QueryManager._update_queue.clear()
+            statements = self._insert_statements(database, table_name, records)
+        except Exception as exc:
+            # the same records would fail the same way again, nothing to retry
+            return 0, exc
+        retries = self.config.update_queue_retries if self.config else 0
+        done, attempt = 0, 0
+        while True:
+            try:
+                for query in statements[done:]:
+                    query_manager._log(query)
+                    query_manager.execute_update(query)
+                    done += 1
+                return len(records), None
+            except Exception as exc:
+                attempt += 1
+                # _run already retried what can be, errors about the statement itself never succeed
+                if attempt > retries or self._retry_policy.classify(exc) is ErrorClass.FATAL:
+                    return done * INSERT_CHUNK_SIZE, exc
+
+    def start_auto_flush(
+        self,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+        flush_interval_secs: float = DEFAULT_FLUSH_INTERVAL_SECS,
+    ) -> None:
+        """Flush the update queue on a background thread, with its own connection,
+        every `flush_interval_secs` or as soon as `flush_size` records are queued.
+        Failed flushes are logged and their records kept for the next one.
+        """
+        self._flusher = self._worker_query_manager()
+
+        def _flush():
+            try:
+                self._flusher.process_update_queue(raise_on_failure=False)
+            except Exception as exc:
+                self._log(f"Auto flush of the update queue failed, will retry: {exc}", level=ERROR)
+
+        QueryManager._update_queue.start_auto_flush(
+            _flush, flush_size=flush_size, flush_interval_secs=flush_interval_secs
+        )
+
+    def stop_auto_flush(self, flush_remaining: bool = True) -> None:
+        """Stop the background flush and, by default, write what is still queued."""
+        QueryManager._update_queue.stop_auto_flush()
+        if self._flusher is not None:
+            if self._flusher._connection is not None:
+                self._flusher.close()
+            self._flusher = None
+        if flush_remaining:
+            self.process_update_queue()
 
     def append_to_table(
         self,
         database: str,
         table: str,
         records: list,
+        staged: bool = False,
     ) -> None:
+        """Append dataclass records with batched INSERTs.
+
+        With `staged`, the records are written to a Parquet file, uploaded to
+        `staging_location` and loaded with a single COPY INTO, which is much faster
+        for very large appends.
+        """
+        if staged:
+            self._append_staged(database, table, records)
+            return
+
+        for query in self._insert_statements(database, table, records):
+            # log statement helps recreate test data required to investigate issues
+            self._log(query)
+            self.execute_update(query)
+
+    def _append_staged(self, database: str, table: str, records: list) -> None:
+        def _copy_into(staged_dir: str, staged_name: str) -> None:
+            query = (
+                f"COPY INTO {database}.{table} FROM '{staged_dir}' "
+                f"FILEFORMAT = PARQUET FILES = ('{staged_name}')"
+            )
+            self._log(query)
+            self.execute_update(query)
+
+        self._run_staged(table, records, _copy_into)
+
+    def _run_staged(self, table: str, records: list, load: Callable[[str, str], None]) -> None:
+        """Stage the records as a Parquet file and call `load` with its directory and name, then clean up."""
+        self._staging_location()
+        local_file = os.path.join(local_staging_dir(self.config.staging_local_dir), new_staging_file_name(table))
+        try:
+            rows = write_parquet(records, local_file)
+            if rows == 0:
+                return
+            staged_dir, staged_name = self._upload_staged_file(local_file)
+            try:
+                self._log(f"Loading {rows} staged rows from {staged_dir}/{staged_name}")
+                load(staged_dir, staged_name)
+            finally:
+                self._remove_staged_file(f"{staged_dir}/{staged_name}")
+        finally:
+            if os.path.exists(local_file):
+                os.remove(local_file)
+
+    def _upload_staged_file(self, local_file: str) -> tuple[str, str]:
+        """Returns the directory and file name the warehouse will load the file from."""
+        location = self._staging_location()
+        file_name = os.path.basename(local_file)
+        self.execute_update(f"PUT '{local_file}' INTO '{location}/{file_name}' OVERWRITE")
+        return location, file_name
+
+    def _remove_staged_file(self, staged_file: str) -> None:
+        self.execute_update(f"REMOVE '{staged_file}'")
+
+    def _staging_location(self) -> str:
+        """The volume staged files are uploaded to, the only place the connector can PUT them."""
+        location = self.config.staging_location
+        if not location:
+            raise ValueError("QueryManagerConfig.staging_location must be set for staged loads")
+        if not is_volume_path(location):
+            raise ValueError(f"QueryManagerConfig.staging_location must be a '/Volumes/...' path, got '{location}'")
+        return location.rstrip("/")
+
+    def _insert_statements(self, database: str, table: str, records: list) -> list[str]:
+        """INSERT statements for `records`, one per chunk of INSERT_CHUNK_SIZE records."""
+        if not records:
+            return []
+
+        columns, rows = self._record_literals(records)
+        statements = []
+        for sublist in more_itertools.chunked(rows, INSERT_CHUNK_SIZE):
+            values = ", ".join(sublist)
+            statements.append(f"INSERT INTO {database}.{table} ({', '.join(columns)}) VALUES {values};")
+        return statements
+
+    def _record_literals(self, records: list) -> tuple[list[str], list[str]]:
+        """Column names of the records and one '(value, ...)' SQL literal per record."""
         # Convert dataclasses to list of dicts
         records_copy = copy.deepcopy(records)
         records_copy = [vars(r) for r in records_copy]
 
         # Get list of column names from dataclass
-        columns = ", ".join(records_copy[0])
+        columns = list(records_copy[0])
 
         # Convert values to strings - uses iso format for dates/datetimes
+        rows = []
         for record in records_copy:
-            for k, v in record.items():
-                record[k] = self._transform(v)
+            values = ", ".join(self._transform(v) for v in record.values())
+            rows.append("(" + values.replace("'None'", "null").replace("None", "null") + ")")
+        return columns, rows
 
-        for sublist in more_itertools.chunked(records_copy, 200):
-            values = "), (".join([", ".join(list(record.values())) for record in sublist])
-            query = f"INSERT INTO {database}.{table} ({columns}) VALUES ({values});"
-            query = query.replace("'None'", "null").replace("None", "null")
-            # log statement helps recreate test data required to investigate issues
-            self._log(query)
-            self.execute_update(query)
+    def upsert_records(
+        self,
+        database: str,
+        table: str,
+        records: list,
+        key_columns: list[str],
+        staged: bool = False,
+        max_statement_chars: int = MAX_STATEMENT_CHARS,
+    ) -> None:
+        """Insert new records and update changed ones, matching them by `key_columns`, with MERGE INTO.
+
+        Matched rows whose values didn't change are not rewritten. When records repeat
+        a key the last one wins. The source is inlined as VALUES, in as few statements as
+        fit `max_statement_chars`, or with `staged` loaded from a single Parquet file.
+        """
+        if not records:
+            return
+
+        unique_records = list(
+            {tuple(record_as_dict(r)[c] for c in key_columns): r for r in records}.values()
+        )
+        columns, rows = self._record_literals(unique_records)
+
+        if staged:
+            def _merge_staged(staged_dir: str, staged_name: str) -> None:
+                source = f"(SELECT * FROM parquet.`{staged_dir}/{staged_name}`)"
+                self.execute_update(self._merge_sql(database, table, columns, key_columns, source=source))
+
+            self._run_staged(table, unique_records, _merge_staged)
+            return
+
+        overhead = len(self._merge_sql(database, table, columns, key_columns, values=[]))
+        for chunk in self._chunk_by_size(rows, max_statement_chars - overhead):
+            self.execute_update(self._merge_sql(database, table, columns, key_columns, values=chunk))
+
+    def _merge_sql(
+        self,
+        database: str,
+        table: str,
+        columns: list[str],
+        key_columns: list[str],
+        values: Optional[list[str]] = None,
+        source: Optional[str] = None,
+    ) -> str:
+        """MERGE INTO statement from either VALUES literals or a `source` relation."""
+        if source is None:
+            source = f"(SELECT * FROM VALUES {', '.join(values)} AS source({', '.join(columns)}))"
+        on = " AND ".join(f"target.{c} = source.{c}" for c in key_columns)
+        changed = " OR ".join(f"NOT (target.{c} <=> source.{c})" for c in columns if c not in key_columns)
+        when_matched = f" WHEN MATCHED AND ({changed}) THEN UPDATE SET *" if changed else ""
+        return (
+            f"MERGE INTO {database}.{table} AS target USING {source} AS source ON {on}"
+            f"{when_matched} WHEN NOT MATCHED THEN INSERT *"
+        )
 
     def get_table(
         self,
@@ -193,9 +594,11 @@ class QueryManager:
         where_clauses: Optional[dict[str, Any]] = None,
         group_by: Optional[str] = None,
         sub_query: Optional[str] = None,
+        use_cache: bool = False,
     ) -> list[dict]:
         """Retrieve data from a query or table in databricks as a list of dict objects
         Must provide either a table or sub query.
+        Use `use_cache` for reference tables that don't change during the run.
         """
 
         if (table is None and sub_query is None) or (table and sub_query):
@@ -214,13 +617,190 @@ class QueryManager:
             query += f" GROUP BY {group_by}"
         if order_by:
             query += f" ORDER BY {', '.join(order_by)}"
-        resp = self.execute_query(query)
-        return [r.asDict() for r in resp]
+        return self.get_table_with_query(query, use_cache=use_cache)
+
+    def get_table_by_keys(
+        self,
+        *,
+        catalog: str,
+        database: str,
+        table: str,
+        key_columns: list[str],
+        keys: Iterable[Any],
+        database_prefix: str = "",
+        query_columns: str = "*",
+        where_clauses: Optional[dict[str, Any]] = None,
+        max_statement_chars: int = MAX_STATEMENT_CHARS,
+        use_cache: bool = False,
+    ) -> dict[Any, list[dict]]:
+        """Fetch the rows of many keys with as few `key IN (...)` queries as fit in `max_statement_chars`.
+
+        Keys are values for a single key column, or tuples matching `key_columns`.
+        Returns the rows found for each given key, an empty list if none.
+        Keys are matched with Python equality, so they should have the column types.
+        """
+        single_column = len(key_columns) == 1
+
+        def _as_tuple(key: Any) -> tuple:
+            if single_column and not isinstance(key, tuple):
+                return (key,)
+            if len(key) != len(key_columns):
+                raise ValueError(f"Key {key} doesn't match the key columns {key_columns}")
+            return tuple(key)
+
+        by_tuple: dict[tuple, Any] = {}
+        for key in keys:
+            by_tuple.setdefault(_as_tuple(key), key)
+        result: dict[Any, list[dict]] = {key: [] for key in by_tuple.values()}
+        if not by_tuple:
+            return result
+
+        query_columns = self._with_key_columns(query_columns, key_columns)
+
+        tbl = f"{catalog}.{database_prefix + database}.{table}"
+        columns = key_columns[0] if single_column else f"({', '.join(key_columns)})"
+        query = f"SELECT {query_columns} FROM {tbl} WHERE "
+        if where_clauses:
+            query += "".join(f"{k} = {v} AND " for k, v in where_clauses.items())
+        query += f"{columns} IN ("
+
+        def _literal(key: tuple) -> str:
+            values = [self._transform(v) if v is not None else "null" for v in key]
+            return values[0] if single_column else f"({', '.join(values)})"
+
+        literals = [_literal(key) for key in by_tuple]
+        for chunk in self._chunk_by_size(literals, max_statement_chars - len(query) - 1):
+            for row in self.get_table_with_query(query + ", ".join(chunk) + ")", use_cache=use_cache):
+                key = by_tuple.get(tuple(row[c] for c in key_columns))
+                if key is not None:
+                    result[key].append(row)
+        return result
+
+    def scan_table(
+        self,
+        *,
+        catalog: str,
+        database: str,
+        table: str,
+        key_columns: list[str],
+        database_prefix: str = "",
+        query_columns: str = "*",
+        where_clauses: Optional[dict[str, Any]] = None,
+        page_size: int = DEFAULT_SCAN_PAGE_SIZE,
+        start_after: Optional[tuple] = None,
+        prefetch: bool = False,
+    ) -> TableScan:
+        """Walk a table in `key_columns` order, one `page_size` page per query.
+
+        Iterate the returned scan for rows, or its `pages()`. After a failure, iterating
+        it again resumes after `scan.last_key`, the key of the last row handed out.
+        With `prefetch` the pages are fetched on a separate connection, the next one
+        while the current one is consumed. Close the scan when stopping early.
+        """
+        query_columns = self._with_key_columns(query_columns, key_columns)
+
+        where = " AND ".join(f"{k} = {v}" for k, v in where_clauses.items()) if where_clauses else None
+        fetch, close = self.get_table_with_query, None
+        if prefetch:
+            worker = self._worker_query_manager()
+            fetch = worker.get_table_with_query
+
+            def _close_worker() -> None:
+                if worker._connection is not None:
+                    worker.close()
+
+            close = _close_worker
+
+        return TableScan(
+            fetch=fetch,
+            select=f"SELECT {query_columns} FROM {catalog}.{database_prefix + database}.{table}",
+            key_columns=key_columns,
+            literal=lambda value: self._transform(value) if value is not None else "null",
+            where=where,
+            page_size=page_size,
+            start_after=start_after,
+            prefetch=prefetch,
+            close=close,
+        )
+
+    @staticmethod
+    def _with_key_columns(query_columns: str, key_columns: list[str]) -> str:
+        """`query_columns` plus the key columns it lacks, rows are matched by them."""
+        if query_columns.strip() == "*":
+            return query_columns
+        selected = {c.strip() for c in query_columns.split(",")}
+        return ", ".join([query_columns, *[c for c in key_columns if c not in selected]])
+
+    @staticmethod
+    def _chunk_by_size(literals: list[str], max_chars: int) -> list[list[str]]:
+        """Split literals in chunks whose ', ' joined length fits `max_chars`, when possible."""
+        chunks, current, size = [], [], 0
+        for literal in literals:
+            if current and size + len(literal) > max_chars:
+                chunks.append(current)
+                current, size = [], 0
+            current.append(literal)
+            size += len(literal) + 2
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def get_table_with_query(self, query: str, use_cache: bool = False) -> list[dict]:
+        """Query a delta table from databricks and return result as a list of dict objects.
+
+        With `use_cache` the result is served from, and stored in, the result cache,
+        which is invalidated by any write made through this QueryManager.
+        """
+        if use_cache:
+            cached = self.result_cache.get(query)
+            if cached is not None:
+                return cached
+            generation = self.result_cache.generation
 
-    def get_table_with_query(self, query: str) -> list[dict]:
-        """Query a delta table from databricks and return result as a list of dict objects."""
         resp = self.execute_query(query)
-        return [r.asDict() for r in resp]
+        result = [r.asDict() for r in resp]
+
+        if use_cache:
+            self.result_cache.put(query, result, generation=generation)
+        return result
+
+    def get_table_data(
+        self,
+        *,
+        context: Any,
+        database: str,
+        table: str,
+        after_col_name: str = "",
+        after_datetime: Any = None,
+    ) -> list[dict]:
+        """Rows of `database.table`, only those with `after_col_name` after `after_datetime` if given.
+
+        Filtered fetches are incremental: the rows and the highest `after_col_name` seen
+        are kept in `context` per table, and later calls only query the rows at or above
+        that mark. Meant for append-only tables, use `forget_snapshots` after deleting or
+        updating rows. Without a column the whole table is read every time.
+        """
+        db_table = f"{database}.{table}"
+        if not after_col_name:
+            return self.get_table_with_query(f"SELECT * FROM {db_table}")
+
+        snapshots = snapshots_in(context)
+        snapshot = snapshots.get((db_table, after_col_name))
+        if snapshot is None or not snapshot.covers(after_datetime):
+            snapshot = TableSnapshot(column=after_col_name, lower=after_datetime)
+            query = f"SELECT * FROM {db_table}"
+            if after_datetime is not None:
+                query += f" WHERE {after_col_name} > {self._transform(after_datetime)}"
+        elif snapshot.mark is not None:
+            query = f"SELECT * FROM {db_table} WHERE {after_col_name} >= {self._transform(snapshot.mark)}"
+        else:
+            query = f"SELECT * FROM {db_table}"
+            if snapshot.lower is not None:
+                query += f" WHERE {after_col_name} > {self._transform(snapshot.lower)}"
+
+        snapshot.merge(self.get_table_with_query(query))
+        snapshots[(db_table, after_col_name)] = snapshot
+        return snapshot.rows_after(after_datetime)
 
     def clear_table(self, database: str, table: str) -> None:
         query = f"DELETE FROM {database}.{table}"
@@ -230,6 +810,7 @@ class QueryManager:
         """Drop database and contents from hive"""
         query = f"DROP DATABASE IF EXISTS {database} CASCADE"
         self.execute_update(query)
+        self.metadata_cache.remove_database(database)
 
     def create_table_from_dataclass(
         self,
@@ -241,22 +822,9 @@ class QueryManager:
         database_prefix: str = "",
         schema_overrides: Optional[dict[str, str]] = None,
     ):
-        """Create a table by inferring datatypes from a given dataclass"""
-
-        mapping = {
-            "DECIMAL": "DECIMAL(16,6)",
-            "MAP": "STRING",
-            "VOID": "STRING",
-            "ARRAY": "ARRAY<STRING>",
-        }
-
-        schema = {}
-        fields = asdict(data_cls())
-
-        for name, data_type in fields.items():
-            _type = st._infer_type(data_type).typeName().upper()
-            schema[name] = mapping.get(_type, _type)
+        """Create a table by inferring datatypes from the annotations of a given dataclass"""
 
+        schema = dict(dataclass_schema(data_cls))
         if schema_overrides:
             schema.update(schema_overrides)
 
@@ -272,12 +840,32 @@ class QueryManager:
          LOCATION 'abfss://temp@{storage_account_name}.dfs.core.windows.net/{database_name}/{table}'
 
         """
-        return self.execute_query(query)
+        result = self.execute_query(query)
+        self.metadata_cache.add_table(f"{catalog}.{database_name}", table)
+        return result
 
 
 class QueryManagerFactory:
     def __init__(self, configuration: QueryManagerConfig) -> None:
         self.configuration = configuration
+        # shared, so a write from any instance invalidates the results cached by all of them
+        self.result_cache = QueryManager._new_result_cache(configuration)
+        self.metadata_cache = QueryManager._new_metadata_cache(configuration)
+        self.profiler = QueryManager._new_profiler(configuration)
 
     def get_query_manager_instance(self) -> QueryManager:
-        return QueryManager(config=self.configuration)
+        if self.configuration.backend == "local":
+            from .local_query_manager import LocalQueryManager
+
+            query_manager_cls = LocalQueryManager
+        elif self.configuration.backend == "databricks":
+            query_manager_cls = QueryManager
+        else:
+            raise ValueError(f"Unknown QueryManager backend '{self.configuration.backend}'")
+
+        return query_manager_cls(
+            config=self.configuration,
+            result_cache=self.result_cache,
+            metadata_cache=self.metadata_cache,
+            profiler=self.profiler,
+        )
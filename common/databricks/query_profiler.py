@@ -0,0 +1,159 @@
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from logging import Logger
+from typing import Optional
+
+
+DEFAULT_SCOPE = "global"
+MAX_RECENT_PROFILES = 1_000
+ROLLUP_TOP = 20
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_VALUE_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint_sql(query: str) -> str:
+    """Query text with literals and value lists replaced by '?', so runs of the same query group together."""
+    fingerprint = _STRING_LITERAL.sub("?", query)
+    fingerprint = _NUMBER_LITERAL.sub("?", fingerprint)
+    fingerprint = _VALUE_LISTS.sub("(?)", fingerprint)
+    return _WHITESPACE.sub(" ", fingerprint).strip().rstrip(";")
+
+
+def estimate_bytes(rows: list) -> int:
+    """Rough size of fetched rows: text length of strings and bytes, 8 bytes for anything else."""
+    size = 0
+    for row in rows:
+        for value in (row.values() if isinstance(row, dict) else row):
+            size += len(value) if isinstance(value, (str, bytes)) else 8
+    return size
+
+
+@dataclass
+class QueryProfile:
+    scope: str
+    fingerprint: str
+    query: str
+    duration_secs: float
+    rows: int
+    bytes_fetched: int
+    reconnected: bool
+    failed: bool
+
+
+@dataclass
+class QueryStats:
+    fingerprint: str
+    count: int = 0
+    total_secs: float = 0.0
+    max_secs: float = 0.0
+    rows: int = 0
+    bytes_fetched: int = 0
+    reconnects: int = 0
+    failures: int = 0
+
+    def add(self, profile: QueryProfile) -> None:
+        self.count += 1
+        self.total_secs += profile.duration_secs
+        self.max_secs = max(self.max_secs, profile.duration_secs)
+        self.rows += profile.rows
+        self.bytes_fetched += profile.bytes_fetched
+        self.reconnects += profile.reconnected
+        self.failures += profile.failed
+
+
+class QueryProfiler:
+    """Thread safe per-query timings, aggregated by scope (eg: a scenario) and SQL fingerprint.
+
+    Only the aggregates and the last `max_recent` profiles are kept. Queries slower
+    than `slow_query_secs` are logged as warnings.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        slow_query_secs: Optional[float] = None,
+        logger: Optional[Logger] = None,
+        max_recent: int = MAX_RECENT_PROFILES,
+    ):
+        self.enabled = enabled or slow_query_secs is not None
+        self.slow_query_secs = slow_query_secs
+        self.logger = logger
+        self.scope: str = DEFAULT_SCOPE
+        self.recent: deque[QueryProfile] = deque(maxlen=max_recent)
+        self._stats: dict[str, dict[str, QueryStats]] = {}
+        self._lock = threading.Lock()
+
+    def start_scope(self, scope: str) -> None:
+        """Attribute the next queries to `scope`, starting it from zero."""
+        with self._lock:
+            self.scope = scope
+            self._stats.pop(scope, None)
+
+    def record(
+        self,
+        query: str,
+        duration_secs: float,
+        rows: Optional[list] = None,
+        reconnected: bool = False,
+        failed: bool = False,
+    ) -> QueryProfile:
+        profile = QueryProfile(
+            scope=self.scope,
+            fingerprint=fingerprint_sql(query),
+            query=query,
+            duration_secs=duration_secs,
+            rows=len(rows) if rows else 0,
+            bytes_fetched=estimate_bytes(rows) if rows else 0,
+            reconnected=reconnected,
+            failed=failed,
+        )
+        with self._lock:
+            self.recent.append(profile)
+            stats = self._stats.setdefault(profile.scope, {})
+            stats.setdefault(profile.fingerprint, QueryStats(profile.fingerprint)).add(profile)
+
+        if self.slow_query_secs is not None and duration_secs >= self.slow_query_secs and self.logger is not None:
+            self.logger.warning(
+                f"Slow query {duration_secs:.2f}s, {profile.rows} rows, {profile.bytes_fetched} bytes"
+                f"{', reconnected' if reconnected else ''}{', failed' if failed else ''}: {query}"
+            )
+        return profile
+
+    def rollup(self, scope: Optional[str] = None) -> list[QueryStats]:
+        """Stats per fingerprint of a scope (the current one by default), slowest in total first."""
+        with self._lock:
+            stats = self._stats.get(scope or self.scope, {})
+            return sorted(
+                (QueryStats(**vars(s)) for s in stats.values()),
+                key=lambda s: s.total_secs,
+                reverse=True,
+            )
+
+    def render_rollup(self, scope: Optional[str] = None, top: int = ROLLUP_TOP, width: int = 120) -> str:
+        """Compact text table of `rollup`, empty if there were no queries."""
+        stats = self.rollup(scope)
+        if not stats:
+            return ""
+
+        total_secs = sum(s.total_secs for s in stats)
+        total_count = sum(s.count for s in stats)
+        lines = [f"{total_count} queries in {total_secs:.2f}s ({len(stats)} distinct)"]
+        lines.append(f"{'count':>6} {'total':>8} {'max':>7} {'rows':>8} {'bytes':>10} {'recon':>5} {'fail':>4}  query")
+        for s in stats[:top]:
+            lines.append(
+                f"{s.count:>6} {s.total_secs:>7.2f}s {s.max_secs:>6.2f}s {s.rows:>8} {s.bytes_fetched:>10} "
+                f"{s.reconnects:>5} {s.failures:>4}  {s.fingerprint[:width]}"
+            )
+        if len(stats) > top:
+            lines.append(f"... and {len(stats) - top} more")
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.recent.clear()
+            self._stats.clear()
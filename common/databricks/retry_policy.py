@@ -0,0 +1,117 @@
+import random
+import re
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable
+
+
+class ErrorClass(Enum):
+    RETRYABLE = "retryable"
+    RECONNECT = "reconnect"
+    FATAL = "fatal"
+
+
+# Databricks errors start with their error class, eg: '[TABLE_OR_VIEW_NOT_FOUND] The table ...'.
+# Any class not listed here is about the statement itself and fatal.
+RECONNECT_ERROR_CLASSES: tuple[str, ...] = (
+    "INVALID_HANDLE",
+    "SESSION_NOT_FOUND",
+    "INVALID_SESSION_HANDLE",
+)
+
+RETRYABLE_ERROR_CLASSES: tuple[str, ...] = (
+    "DELTA_CONCURRENT_",
+    "DELTA_METADATA_CHANGED",
+    "DELTA_PROTOCOL_CHANGED",
+    "TEMPORARILY_UNAVAILABLE",
+    "RESOURCE_EXHAUSTED",
+    "WAREHOUSE_STARTING",
+)
+
+RECONNECT_HTTP_CODES: tuple[int, ...] = (401, 403)
+RETRYABLE_HTTP_CODES: tuple[int, ...] = (429, 502, 503, 504)
+
+# Messages without an error class are matched on these phrases, never on bare numbers or
+# words that could come from the SQL text or object names echoed in the message
+RECONNECT_MESSAGES: tuple[str, ...] = (
+    "Invalid SessionHandle",
+    "Invalid OperationHandle",
+    "Session is closed",
+    "session is closed",
+    "token is expired",
+)
+
+RETRYABLE_MESSAGES: tuple[str, ...] = (
+    "Too Many Requests",
+    "Service Unavailable",
+    "database is locked",
+)
+
+# Connector errors about the transport or the session, checked by name to keep databricks-sql optional here
+RECONNECT_EXCEPTIONS: tuple[str, ...] = (
+    "RequestError",
+    "InterfaceError",
+    "SessionAlreadyClosedError",
+    "CursorAlreadyClosedError",
+)
+
+_ERROR_CLASS = re.compile(r"^\s*\[([A-Z][A-Z0-9_]*)(?:\.[A-Z0-9_.]+)?\]")
+
+
+@dataclass
+class RetryPolicy:
+    """Classifies execution errors and spaces their retries with bounded exponential backoff.
+
+    Errors are classified by their Databricks error class, then the HTTP status of the
+    request, then a few fixed phrases and the exception type. Server errors about the
+    statement itself (syntax, missing tables, ...) are fatal and raised at once. Throttling
+    and concurrency conflicts are retried on the same connection, transport and session
+    errors on a new one.
+    """
+
+    max_attempts: int = 4
+    base_delay_secs: float = 0.5
+    max_delay_secs: float = 15.0
+    jitter: float = 0.25
+    reconnect_error_classes: tuple[str, ...] = RECONNECT_ERROR_CLASSES
+    retryable_error_classes: tuple[str, ...] = RETRYABLE_ERROR_CLASSES
+    reconnect_http_codes: tuple[int, ...] = RECONNECT_HTTP_CODES
+    retryable_http_codes: tuple[int, ...] = RETRYABLE_HTTP_CODES
+    retryable_messages: tuple[str, ...] = RETRYABLE_MESSAGES
+    reconnect_messages: tuple[str, ...] = RECONNECT_MESSAGES
+    reconnect_exceptions: tuple[str, ...] = RECONNECT_EXCEPTIONS
+    sleep: Callable[[float], None] = time.sleep
+
+    def classify(self, exc: BaseException) -> ErrorClass:
+        message = str(getattr(exc, "message", None) or exc)
+        match = _ERROR_CLASS.match(message)
+        if match:
+            error_class = match.group(1)
+            if error_class.startswith(self.reconnect_error_classes):
+                return ErrorClass.RECONNECT
+            if error_class.startswith(self.retryable_error_classes):
+                return ErrorClass.RETRYABLE
+            return ErrorClass.FATAL
+
+        context = getattr(exc, "context", None)
+        http_code = context.get("http-code") if isinstance(context, dict) else None
+        if http_code in self.reconnect_http_codes:
+            return ErrorClass.RECONNECT
+        if http_code in self.retryable_http_codes:
+            return ErrorClass.RETRYABLE
+
+        if any(marker in message for marker in self.reconnect_messages):
+            return ErrorClass.RECONNECT
+        if any(marker in message for marker in self.retryable_messages):
+            return ErrorClass.RETRYABLE
+        if isinstance(exc, (ConnectionError, TimeoutError)) or any(
+            cls.__name__ in self.reconnect_exceptions for cls in type(exc).__mro__
+        ):
+            return ErrorClass.RECONNECT
+        return ErrorClass.FATAL
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after failed `attempt` (1 based)."""
+        delay = min(self.max_delay_secs, self.base_delay_secs * 2 ** (attempt - 1))
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
@@ -0,0 +1,13 @@
+# a possibly qualified and backquoted name, eg: cat.`db`.table
+IDENTIFIER = r"[`\w][\w`]*(?:\.[`\w][\w`]*)*"
+
+
+def normalize_name(name: str) -> tuple[str, ...]:
+    """Lowercase name parts, without backquotes."""
+    return tuple(part.strip("`").lower() for part in name.split("."))
+
+
+def same_object(a: tuple[str, ...], b: tuple[str, ...]) -> bool:
+    """Whether two normalized names can refer to the same object, eg: 'db.table' and 'catalog.db.table'."""
+    size = min(len(a), len(b))
+    return a[-size:] == b[-size:]
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import uuid
+from dataclasses import asdict, is_dataclass
+from typing import Any, Iterable
+
+import more_itertools
+
+
+PARQUET_ROW_GROUP_SIZE = 100_000
+
+
+def is_volume_path(location: str) -> bool:
+    """Unity Catalog volumes are uploaded to with PUT, anything else is copied to as a directory."""
+    return location.startswith("/Volumes/")
+
+
+def record_as_dict(record: Any) -> dict:
+    if isinstance(record, dict):
+        return record
+    if is_dataclass(record):
+        return asdict(record)
+    return dict(vars(record))
+
+
+def new_staging_file_name(table: str) -> str:
+    return f"{table}_{uuid.uuid4().hex}.parquet"
+
+
+def write_parquet(records: Iterable[Any], path: str, row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> int:
+    """Write dataclass records to a Parquet file, one row group at a time. Returns the number of rows."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("Staged appends need pyarrow, install it with 'pip install pyarrow'") from exc
+
+    rows = 0
+    writer = None
+    try:
+        for chunk in more_itertools.chunked(records, row_group_size):
+            data = [record_as_dict(record) for record in chunk]
+            if writer is None:
+                table = pa.Table.from_pylist(data)
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                table = pa.Table.from_pylist(data, schema=writer.schema)
+            writer.write_table(table)
+            rows += len(data)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def local_staging_dir(staging_local_dir: str | None) -> str:
+    path = staging_local_dir or os.path.join(tempfile.gettempdir(), "query_manager_staging")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def copy_to_directory(local_file: str, directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    return shutil.copy(local_file, os.path.join(directory, os.path.basename(local_file)))
@@ -0,0 +1,114 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional
+
+
+DEFAULT_SCAN_PAGE_SIZE = 10_000
+
+
+def keyset_predicate(key_columns: list[str], literals: list[str]) -> str:
+    """Rows after the key, in key order: 'a > x OR (a = x AND b > y) OR ...'."""
+    terms = []
+    for position, column in enumerate(key_columns):
+        equal = [f"{c} = {v}" for c, v in zip(key_columns[:position], literals[:position])]
+        terms.append(" AND ".join([*equal, f"{column} > {literals[position]}"]))
+    return terms[0] if len(terms) == 1 else " OR ".join(f"({term})" for term in terms)
+
+
+class TableScan:
+    """Pages of a query in key order, each fetched with `WHERE key > last LIMIT page_size`.
+
+    Unlike OFFSET, each page costs the same however deep the scan is. `last_key` is the
+    key of the last row handed out: iterating again after a failure resumes after it, and
+    a new scan given it as `start_after` continues where this one stopped. With `prefetch`
+    the next page is fetched in a background thread while the current one is consumed,
+    so `fetch` must be safe to call from another thread.
+    Key columns must be unique together and not null.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], list[dict]],
+        select: str,
+        key_columns: list[str],
+        literal: Callable[[Any], str],
+        where: Optional[str] = None,
+        page_size: int = DEFAULT_SCAN_PAGE_SIZE,
+        start_after: Optional[tuple] = None,
+        prefetch: bool = False,
+        close: Optional[Callable[[], None]] = None,
+    ):
+        if not key_columns:
+            raise ValueError("A keyset scan needs at least one key column")
+        if page_size < 1:
+            raise ValueError("page_size must be positive")
+        self.fetch = fetch
+        self.select = select
+        self.key_columns = key_columns
+        self.literal = literal
+        self.where = where
+        self.page_size = page_size
+        self.last_key = tuple(start_after) if start_after is not None else None
+        self.prefetch = prefetch
+        self.pages_fetched = 0
+        self.done = False
+        self._close = close
+
+    def page_query(self, after: Optional[tuple]) -> str:
+        conditions = [f"({self.where})"] if self.where else []
+        if after is not None:
+            conditions.append(f"({keyset_predicate(self.key_columns, [self.literal(v) for v in after])})")
+        query = self.select
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return f"{query} ORDER BY {', '.join(self.key_columns)} LIMIT {self.page_size}"
+
+    def _fetch_page(self, after: Optional[tuple]) -> list[dict]:
+        page = self.fetch(self.page_query(after))
+        self.pages_fetched += 1
+        return page
+
+    def _key(self, row: dict) -> tuple:
+        return tuple(row[c] for c in self.key_columns)
+
+    def pages(self) -> Iterator[list[dict]]:
+        if self.done:
+            return
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        try:
+            after = self.last_key
+            pending: Optional[Future] = executor.submit(self._fetch_page, after) if executor else None
+            while True:
+                page = pending.result() if pending is not None else self._fetch_page(after)
+                pending = None
+                if not page:
+                    break
+                after = self._key(page[-1])
+                if executor is not None and len(page) == self.page_size:
+                    pending = executor.submit(self._fetch_page, after)
+                yield page
+                self.last_key = after
+                if len(page) < self.page_size:
+                    break
+            self.done = True
+            self.close()
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def __iter__(self) -> Iterator[dict]:
+        for page in self.pages():
+            for row in page:
+                yield row
+                self.last_key = self._key(row)
+
+    def close(self) -> None:
+        """Release what the fetches use. Done after the last page, needed when stopping early."""
+        if self._close is not None:
+            close, self._close = self._close, None
+            close()
+
+    def __enter__(self) -> "TableScan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,56 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+
+WATERMARKS_ATTRIBUTE = "TABLE_WATERMARKS"
+
+
+def comparable(value: Any) -> Any:
+    """Naive datetimes are taken as UTC, so they compare with aware ones."""
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@dataclass
+class TableSnapshot:
+    """Rows of a table with `column` after `lower` (all rows if None), up to the high-water `mark`."""
+
+    column: str
+    lower: Any
+    rows: list[dict] = field(default_factory=list)
+    mark: Any = None
+
+    def covers(self, after: Any) -> bool:
+        return self.lower is None or (after is not None and comparable(after) >= comparable(self.lower))
+
+    def merge(self, rows: list[dict]) -> None:
+        """Add rows fetched with `column >= mark`, replacing the ones already held at the mark."""
+        if self.mark is not None:
+            mark = comparable(self.mark)
+            self.rows = [row for row in self.rows if comparable(row[self.column]) != mark]
+        self.rows.extend(rows)
+        values = [row[self.column] for row in rows if row[self.column] is not None]
+        if values:
+            self.mark = max([self.mark, *values] if self.mark is not None else values, key=comparable)
+
+    def rows_after(self, after: Any) -> list[dict]:
+        if after is None:
+            return list(self.rows)
+        after = comparable(after)
+        return [row for row in self.rows if row[self.column] is not None and comparable(row[self.column]) > after]
+
+
+def snapshots_in(context: Any) -> dict[tuple[str, str], TableSnapshot]:
+    """Snapshots by (table, column) kept on `context`, so they live as long as its current layer."""
+    if not hasattr(context, WATERMARKS_ATTRIBUTE):
+        setattr(context, WATERMARKS_ATTRIBUTE, {})
+    return getattr(context, WATERMARKS_ATTRIBUTE)
+
+
+def forget_snapshots(context: Any, table: Optional[str] = None) -> None:
+    """Drop the snapshots of `table` ('db.table'), or all of them, so the next fetch reads everything."""
+    snapshots = snapshots_in(context)
+    for key in [key for key in snapshots if table is None or key[0] == table]:
+        del snapshots[key]
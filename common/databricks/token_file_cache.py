@@ -0,0 +1,70 @@
+import contextlib
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: the cache is still shared, but refreshes aren't serialized
+    fcntl = None
+
+
+DEFAULT_TOKEN_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "databricks_token_provider")
+
+
+class TokenFileCache:
+    """A token shared by the local processes through a file only the current user can read.
+
+    Writes replace the file atomically, so it's read without locking. Refreshes hold an
+    exclusive lock on a side file: the processes waiting for it read the token the first
+    one wrote instead of fetching their own.
+    """
+
+    def __init__(self, resource_id: str, directory: str = DEFAULT_TOKEN_CACHE_DIR):
+        name = hashlib.sha256(resource_id.encode()).hexdigest()[:16]
+        self.directory = directory
+        self.path = os.path.join(directory, f"{name}.json")
+        self.lock_path = os.path.join(directory, f"{name}.lock")
+
+    def _ensure_directory(self) -> None:
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+
+    def read(self) -> Optional[tuple[str, datetime]]:
+        """The cached token and when it was generated, None if there's no usable one."""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+            if not data["token"]:
+                return None
+            return data["token"], datetime.fromisoformat(data["generated_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def write(self, token: str, generated_at: datetime) -> None:
+        self._ensure_directory()
+        temporary_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+                json.dump({"token": token, "generated_at": generated_at.isoformat()}, file)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(temporary_path)
+            raise
+
+    @contextlib.contextmanager
+    def refresh_lock(self) -> Iterator[None]:
+        """Exclusive between the local processes, blocks until the current holder is done."""
+        self._ensure_directory()
+        descriptor = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(descriptor, fcntl.LOCK_EX)
+            yield
+        finally:
+            # closing the descriptor releases the lock
+            os.close(descriptor)
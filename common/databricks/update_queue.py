@@ -0,0 +1,176 @@
+import threading
+from queue import Full
+from time import monotonic
+from typing import Callable, Optional
+
+
+DEFAULT_MAX_QUEUED_RECORDS: int = 100_000
+DEFAULT_FLUSH_SIZE: int = 5_000
+DEFAULT_FLUSH_INTERVAL_SECS: float = 30.0
+DEFAULT_PUT_TIMEOUT_SECS: float = 5 * 60
+
+
+class UpdateQueueError(Exception):
+    def __init__(self, result: "UpdateQueueResult"):
+        self.result = result
+        failed = ", ".join(f"{db_table}: {exc}" for db_table, exc in result.failed.items())
+        super().__init__(f"Failed to flush {len(result.failed)} table(s) from the update queue - {failed}")
+
+
+class UpdateQueueResult:
+    def __init__(self) -> None:
+        self.successful: dict[str, int] = {}
+        self.failed: dict[str, Exception] = {}
+        self.all_successful = True
+
+    def add_success(self, db_table: str, records_written: int) -> None:
+        self.successful[db_table] = records_written
+
+    def add_failed(self, db_table: str, exception: Exception) -> None:
+        self.failed[db_table] = exception
+        self.all_successful = False
+
+
+class UpdateQueue:
+    """Thread safe, bounded write-behind queue of records per 'database.table'.
+
+    Records count against `max_records` from the moment they are queued until
+    the flush that took them is acknowledged, so memory stays bounded even while
+    a flush is running. When full, `put` waits for the flusher (backpressure),
+    or raises `queue.Full` if no flusher is running, `timeout` is reached or
+    a flush fails while waiting.
+    """
+
+    def __init__(self, max_records: int = DEFAULT_MAX_QUEUED_RECORDS):
+        self.max_records = max_records
+        self._pending: dict[str, list] = {}
+        self._pending_count: int = 0
+        self._in_flight_count: int = 0
+        self._condition = threading.Condition()
+        self._flush_size: Optional[int] = None
+        self._flush_requested = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._stop_flusher = threading.Event()
+        # why the last flush put its records back, cleared by the next one that writes
+        self.last_flush_error: Optional[BaseException] = None
+
+    def __len__(self) -> int:
+        return self._pending_count
+
+    @property
+    def size(self) -> int:
+        """Records currently held, either waiting or being flushed."""
+        return self._pending_count + self._in_flight_count
+
+    def put(self, db_table: str, records: list, timeout: Optional[float] = DEFAULT_PUT_TIMEOUT_SECS) -> None:
+        """Queue records, waiting up to `timeout` seconds (None for no limit) for room."""
+        records = list(records)
+        deadline = None if timeout is None else monotonic() + timeout
+        with self._condition:
+            failed_flush = self.last_flush_error
+            # a batch bigger than the whole queue is let in once the queue is empty
+            while self.size and self.size + len(records) > self.max_records:
+                if not self.is_auto_flushing():
+                    raise Full(
+                        f"Update queue is full ({self.size} records), call process_update_queue or start auto flush"
+                    )
+                if self.last_flush_error is not None and self.last_flush_error is not failed_flush:
+                    # the records put back don't make room, waiting longer won't help
+                    raise Full(
+                        f"Update queue is still full ({self.size} records), flushing it failed: {self.last_flush_error}"
+                    ) from self.last_flush_error
+                self._flush_requested.set()
+                remaining = None if deadline is None else deadline - monotonic()
+                if (remaining is not None and remaining <= 0) or not self._condition.wait(timeout=remaining):
+                    raise Full(f"Update queue is still full ({self.size} records) after {timeout} seconds")
+
+            self._pending.setdefault(db_table, []).extend(records)
+            self._pending_count += len(records)
+
+            if self._flush_size is not None and self._pending_count >= self._flush_size:
+                self._flush_requested.set()
+
+    def take(self) -> dict[str, list]:
+        """Remove and return everything queued. Must be followed by `ack` or `requeue`."""
+        with self._condition:
+            batch, self._pending = self._pending, {}
+            self._in_flight_count += self._pending_count
+            self._pending_count = 0
+            return batch
+
+    def ack(self, batch: dict[str, list]) -> None:
+        """Release the space used by a batch that was written."""
+        with self._condition:
+            written = sum(len(records) for records in batch.values())
+            self._in_flight_count -= written
+            if written:
+                self.last_flush_error = None
+            self._condition.notify_all()
+
+    def requeue(self, batch: dict[str, list], error: Optional[BaseException] = None) -> None:
+        """Put back, ahead of newer records, a batch that could not be written because of `error`.
+
+        Producers waiting for room are woken up to raise it, as a failed flush frees none.
+        """
+        with self._condition:
+            for db_table, records in batch.items():
+                self._pending[db_table] = list(records) + self._pending.get(db_table, [])
+                self._pending_count += len(records)
+                self._in_flight_count -= len(records)
+            if error is not None and batch:
+                self.last_flush_error = error
+                self._condition.notify_all()
+
+    def clear(self) -> None:
+        with self._condition:
+            self._pending.clear()
+            self._pending_count = 0
+            self._condition.notify_all()
+
+    def items(self):
+        """Snapshot of the queued records per 'database.table'."""
+        with self._condition:
+            return [(db_table, list(records)) for db_table, records in self._pending.items()]
+
+    def is_auto_flushing(self) -> bool:
+        return self._flusher is not None and self._flusher.is_alive()
+
+    def start_auto_flush(
+        self,
+        flush: Callable[[], None],
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+        flush_interval_secs: float = DEFAULT_FLUSH_INTERVAL_SECS,
+    ) -> None:
+        """Run `flush` on a daemon thread every `flush_interval_secs`,
+        or as soon as `flush_size` records are waiting.
+        """
+        if self.is_auto_flushing():
+            raise RuntimeError("Update queue auto flush is already running")
+
+        self._flush_size = flush_size
+        self._stop_flusher.clear()
+
+        def _run():
+            next_flush = monotonic() + flush_interval_secs
+            while not self._stop_flusher.is_set():
+                self._flush_requested.wait(timeout=max(next_flush - monotonic(), 0))
+                self._flush_requested.clear()
+                if self._pending_count:
+                    flush()
+                next_flush = monotonic() + flush_interval_secs
+
+        self._flusher = threading.Thread(target=_run, name="QueryManagerUpdateQueue", daemon=True)
+        self._flusher.start()
+
+    def stop_auto_flush(self, timeout: Optional[float] = None) -> None:
+        """Stop the flusher thread, letting a running flush finish."""
+        if self._flusher is None:
+            return
+        self._stop_flusher.set()
+        self._flush_requested.set()
+        self._flusher.join(timeout=timeout)
+        self._flusher = None
+        self._flush_size = None
+        with self._condition:
+            # wake producers waiting for space, they will now fail fast
+            self._condition.notify_all()
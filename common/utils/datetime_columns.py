@@ -0,0 +1,106 @@
+"""Column counterparts of common.utils.datetimes, working on whole pandas Series at once."""
+from datetime import timezone, tzinfo
+from typing import Iterable, Literal
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from common.utils.datetimes import DATETIME_FORMAT_DEFAULT
+
+
+def _as_series(values: Iterable) -> pd.Series:
+    return values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+
+
+def _timezone(tz: tzinfo | str) -> tzinfo:
+    return ZoneInfo(tz) if isinstance(tz, str) else tz
+
+
+def _localize(naive: pd.Series, tz: tzinfo) -> pd.Series:
+    """tz_localize with the instants of datetime.replace(tzinfo=tz), that is fold=0, around DST changes.
+
+    Repeated wall times are the first of the two. Skipped ones take the offset from before
+    the change, and as pandas can't hold them are shown after it, eg: 01:30+00:00 as 02:30+01:00.
+    """
+    # True picks the DST instant, the first one when clocks go back
+    localized = naive.dt.tz_localize(tz, ambiguous=np.ones(len(naive), dtype=bool), nonexistent="NaT")
+    skipped = localized.isna() & naive.notna()
+    if skipped.any():
+        # the last instant before the change has the offset from before it
+        before = naive[skipped].dt.tz_localize(tz, ambiguous=True, nonexistent="shift_backward")
+        offset = before.dt.tz_localize(None) - before.dt.tz_convert(timezone.utc).dt.tz_localize(None)
+        localized[skipped] = (naive[skipped] - offset).dt.tz_localize(timezone.utc).dt.tz_convert(tz)
+    return localized
+
+
+def string_column_to_datetime(
+    values: Iterable,
+    /, *,
+    format_: str | None = DATETIME_FORMAT_DEFAULT,
+    tz: tzinfo | str | None = timezone.utc,
+    errors: Literal["raise", "coerce"] = "raise",
+) -> pd.Series:
+    """Like string_to_datetime: naive values get `tz`, aware ones are converted to it.
+
+    With `format_=None` any ISO 8601 text is accepted. Values may already be datetimes.
+    In a column mixing naive and aware values, or offsets, naive values are read as UTC.
+    With errors="coerce" what can't be parsed becomes NaT.
+    """
+    series = _as_series(values)
+    format_ = format_ or "ISO8601"
+    try:
+        parsed = pd.to_datetime(series, format=format_, errors=errors)
+    except ValueError:
+        parsed = None
+    if parsed is None or not pd.api.types.is_datetime64_any_dtype(parsed):
+        # mixed offsets either raise or come back as objects, unparseable values raise again here
+        parsed = pd.to_datetime(series, format=format_, errors=errors, utc=True)
+    if tz is None:
+        return parsed
+    tz = _timezone(tz)
+    if isinstance(parsed.dtype, pd.DatetimeTZDtype):
+        return parsed.dt.tz_convert(tz)
+    return _localize(parsed, tz)
+
+
+def replace_timezone_column(values: pd.Series, /, tz: tzinfo | str = timezone.utc) -> pd.Series:
+    """Like replace_timezone: same wall time, in `tz`."""
+    if isinstance(values.dtype, pd.DatetimeTZDtype):
+        values = values.dt.tz_localize(None)
+    return _localize(values, _timezone(tz))
+
+
+def change_timezone_column(values: pd.Series, /, tz: tzinfo | str = timezone.utc) -> pd.Series:
+    """Like change_timezone: same instant, in `tz`. Naive values are taken as UTC."""
+    if not isinstance(values.dtype, pd.DatetimeTZDtype):
+        values = values.dt.tz_localize(timezone.utc)
+    return values.dt.tz_convert(_timezone(tz))
+
+
+def datetime_column_to_string(values: pd.Series, /, format_: str = DATETIME_FORMAT_DEFAULT) -> pd.Series:
+    """Like datetime_to_string, NaT stays null."""
+    return values.dt.strftime(format_)
+
+
+def isoformat_with_offset_column(values: pd.Series, /, *, sep: Literal["T", " "] = "T") -> pd.Series:
+    """2024-09-01T00:35:30+01:00, for timezone aware values"""
+    as_str = values.dt.strftime(f"%Y-%m-%d{sep}%H:%M:%S%z")
+    return as_str.str[:-2] + ":" + as_str.str[-2:]
+
+
+def normalize_datetime_columns(
+    table: pd.DataFrame | list[dict],
+    columns: Iterable[str],
+    /, *,
+    format_: str | None = DATETIME_FORMAT_DEFAULT,
+    tz: tzinfo | str | None = timezone.utc,
+) -> pd.DataFrame:
+    """Parse and convert to `tz` the given columns of a table, eg: the rows of QueryManager.get_table.
+
+    Returns a new DataFrame, the other columns are left as they are.
+    """
+    frame = table.copy() if isinstance(table, pd.DataFrame) else pd.DataFrame.from_records(table)
+    for column in columns:
+        frame[column] = string_column_to_datetime(frame[column], format_=format_, tz=tz)
+    return frame
@@ -1,4 +1,6 @@
+import re
 from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from functools import lru_cache
 from time import perf_counter
 from typing import Literal
 from zoneinfo import ZoneInfo
@@ -83,14 +85,102 @@ def isoformat_long(datetime_: datetime, /, *, sep: Literal["T", " "] = "T") -> s
 def string_to_datetime(datetime_: str, /, *, format_: str = DATETIME_FORMAT_DEFAULT, tz: tzinfo | str = timezone.utc) -> datetime:
     if isinstance(tz, str):
         tz = ZoneInfo(tz)
-    _result = datetime.strptime(datetime_, format_)
+    return _with_timezone(datetime.strptime(datetime_, format_), tz)
+
+
+def _with_timezone(datetime_: datetime, tz: tzinfo | None) -> datetime:
     if tz is None:
-        return _result
+        return datetime_
     else:
-        if _result.tzinfo is None:
-            return _result.replace(tzinfo=tz)
+        if datetime_.tzinfo is None:
+            return datetime_.replace(tzinfo=tz)
         else:
-            return _result.astimezone(tz)
+            return datetime_.astimezone(tz)
+
+
+# Layouts that datetime.fromisoformat parses exactly like strptime would, when the text has this shape
+_ISO_SHAPES = {
+    DATETIME_FORMAT_DEFAULT: re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}"),
+    DATETIME_FORMAT_ISO: re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}"),
+    DATETIME_FORMAT_OFFSET: re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}(?:Z|[+-][0-9]{2}:?[0-9]{2})"),
+    DATE_FORMAT_ISO: re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}"),
+}
+
+# A superset of what strptime accepts for each directive, to skip formats that can't fit without trying them
+_DIRECTIVE_SHAPES = {
+    "Y": r"\d{4}", "y": r"\d{2}", "m": r"\s?\d{1,2}", "d": r"\s?\d{1,2}", "H": r"\s?\d{1,2}", "I": r"\s?\d{1,2}",
+    "M": r"\s?\d{1,2}", "S": r"\s?\d{1,2}", "j": r"\d{1,3}", "f": r"\d{1,6}", "%": "%",
+    "z": r"(?:Z|[+-]\d{2}:?\d{2}(?::?\d{2}(?:\.\d{1,6})?)?)",
+}
+
+
+class _FormatParser:
+    """A strptime format with a cheap shape check, and a fromisoformat fast path for the ISO layouts."""
+
+    def __init__(self, format_: str):
+        self.format = format_
+        self.iso_shape = _ISO_SHAPES.get(format_)
+        self.shape = self._shape_of(format_)
+
+    @staticmethod
+    def _shape_of(format_: str) -> re.Pattern | None:
+        parts = []
+        for literal, directive in re.findall(r"([^%]*)(?:%(.)|$)", format_):
+            # like strptime, any run of whitespace matches any other
+            parts.append(r"\s+".join(re.escape(chunk) for chunk in re.split(r"\s+", literal)))
+            if directive:
+                if directive not in _DIRECTIVE_SHAPES:
+                    return None  # can't tell, strptime will
+                parts.append(_DIRECTIVE_SHAPES[directive])
+        return re.compile("".join(parts), re.IGNORECASE)
+
+    def may_fit(self, value: str) -> bool:
+        return self.shape is None or self.shape.fullmatch(value) is not None
+
+    def parse(self, value: str) -> datetime:
+        if self.iso_shape is not None and self.iso_shape.fullmatch(value):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass  # eg: 'Z' or '+0130' offsets before Python 3.11, strptime knows them
+        return datetime.strptime(value, self.format)
+
+
+@lru_cache(maxsize=None)
+def _format_parser(format_: str) -> _FormatParser:
+    return _FormatParser(format_)
+
+
+class _FormatSniffer:
+    """Parses with the first format of a list that fits, trying the one that fit last first.
+
+    The remembered format is only taken when no earlier format could fit the text,
+    so the result is the same as trying them in order.
+    """
+
+    def __init__(self, formats: list[str]):
+        self.parsers = [_format_parser(format_) for format_ in formats]
+        self.last: int | None = None
+
+    def parse(self, value: str) -> datetime:
+        last, tried = self.last, None
+        if last is not None and not any(parser.may_fit(value) for parser in self.parsers[:last]):
+            parser, tried = self.parsers[last], last
+            if parser.may_fit(value):
+                try:
+                    return parser.parse(value)
+                except Exception:
+                    pass
+        for index, parser in enumerate(self.parsers):
+            if index == tried or not parser.may_fit(value):
+                continue
+            try:
+                result = parser.parse(value)
+            except Exception:
+                continue
+            self.last = index
+            return result
+        raise ValueError(f"No format fit to decode '{value}")
 
 
 def string_to_date(date_: str, /, *, format_: str = DATE_FORMAT_ISO) -> date:
@@ -115,6 +205,7 @@ class DateCompare:
             dt_str_format: str | list[str] = DATE_FORMAT_ISO,
     ):
         self.dt_str_format: list[str] | str = dt_str_format if isinstance(dt_str_format, list) else [dt_str_format]
+        self._sniffer = _FormatSniffer(self.dt_str_format)
         self.expected = self._convert_to_date(expected)
         self.min_dt = dt_min or timedelta(0)
         self.max_dt = dt_max or timedelta(0)
@@ -123,12 +214,7 @@ class DateCompare:
         if isinstance(date_value, date):
             return date_value
         if isinstance(date_value, str):
-            for dt_str_format in self.dt_str_format:
-                try:
-                    return string_to_date(date_value, format_=dt_str_format)
-                except Exception:
-                    pass
-            raise ValueError(f"No format fit to decode '{date_value}")
+            return self._sniffer.parse(date_value).date()
         raise TypeError(f"Date {date_value} is {type(date_value)}. Can only accept objects that are date or string.")
 
     def __eq__(self, other):
@@ -154,6 +240,7 @@ class DatetimeCompare:
     ):
         self.tz = ZoneInfo(tz) if isinstance(tz, str) else tz
         self.dt_str_format: list[str] | str = dt_str_format if isinstance(dt_str_format, list) else [dt_str_format]
+        self._sniffer = _FormatSniffer(self.dt_str_format)
         self.expected = self._convert_to_datetime(expected)
         self.min_dt = dt_min or timedelta(0)
         self.max_dt = dt_max or timedelta(0)
@@ -162,13 +249,7 @@ class DatetimeCompare:
         if isinstance(datetime_value, datetime):
             return datetime_value
         if isinstance(datetime_value, str):
-            for dt_str_format in self.dt_str_format:
-                try:
-                    _result = string_to_datetime(datetime_value, format_=dt_str_format, tz=self.tz)
-                    return _result if self.tz is None or _result.tzinfo else _result.replace(tzinfo=self.tz)
-                except Exception:
-                    pass
-            raise ValueError(f"No format fit to decode '{datetime_value}")
+            return _with_timezone(self._sniffer.parse(datetime_value), self.tz)
         raise TypeError(f"Expected {datetime_value} is {type(datetime_value)}. Can only accept objects that are datetime or string.")
 
     def __eq__(self, other):
@@ -1,5 +1,5 @@
 import json
-from typing import Literal
+from typing import Any, Iterator, Literal
 
 import pandas as pd
 import yaml
@@ -24,3 +24,11 @@ def read_data_file(
             raise ValueError(f"Unsupported data file type: {dtype}.")
 
         return data
+
+
+def iter_jsonl(filepath: str) -> Iterator[Any]:
+    """Objects of a JSON Lines file, read one line at a time. Blank lines are skipped."""
+    with open(filepath, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from common.assertions.compare import assert_equal_lists, assert_equal_records_by_key, fingerprint
+from common.utils.datetimes import DatetimeCompare
+
+
+def test_fingerprint_is_order_insensitive_for_lists():
+    assert fingerprint({"a": [1, 2, {"b": None}]}) == fingerprint({"a": ({"b": None}, 2, 1)})
+    assert fingerprint([1, 1, 2]) != fingerprint([1, 2, 2])
+    assert fingerprint({"a": 1}) != fingerprint({"a": 1.0})
+    assert fingerprint({"a": DatetimeCompare(datetime(2024, 1, 1))}) is None
+    assert fingerprint(float("nan")) is None
+
+
+def test_equal_lists_of_rows():
+    rows = [{"id": i, "tags": [str(i), "x"]} for i in range(2_000)]
+
+    assert_equal_lists(rows, [{"id": r["id"], "tags": list(reversed(r["tags"]))} for r in reversed(rows)])
+
+
+def test_inexact_elements_are_compared_deeply():
+    now = datetime(2024, 1, 1, 10)
+    expected = [{"id": 1, "at": DatetimeCompare(now, timedelta(minutes=1), timedelta(minutes=1))}, {"id": 2}, {"id": 3}]
+
+    assert_equal_lists(expected, [{"id": 3}, {"id": 2, "extra": True}, {"id": 1, "at": now}])
+
+
+def test_missing_element_is_reported():
+    with pytest.raises(AssertionError, match=r"expected\[1\] '\{'id': 2\}' is not inside received"):
+        assert_equal_lists([{"id": 1}, {"id": 2}], [{"id": 1}, {"id": 3}])
+
+
+def test_records_by_key():
+    expected = [{"id": 1, "v": "a"}, {"id": 2, "v": "b"}, {"id": 3, "v": "c"}]
+
+    assert_equal_records_by_key(expected, list(reversed(expected)), "id")
+    with pytest.raises(AssertionError) as error:
+        assert_equal_records_by_key(expected, [{"id": 1, "v": "a"}, {"id": 2, "v": "x"}, {"id": 4, "v": "d"}], ["id"])
+
+    assert str(error.value).splitlines() == [
+        "expected and received differ by (id):",
+        "1 keys missing from received:",
+        "  (3,)",
+        "1 rows with different values:",
+        "  (2,): expected[1].v = 'b' not equal to received[1].v = 'x'",
+        "1 unexpected keys in received:",
+        "  (4,)",
+    ]
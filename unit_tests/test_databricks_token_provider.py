@@ -0,0 +1,132 @@
+import os
+import stat
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from common.databricks.databricks_token_provider import DatabricksTokenProvider
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2024, 8, 9, 10, 0, tzinfo=timezone.utc)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+class FakeRetriever:
+    def __init__(self):
+        self.calls = 0
+        self.called = threading.Event()
+
+    def __call__(self, resource_id: str) -> str:
+        self.calls += 1
+        self.called.set()
+        return f"token-{self.calls}"
+
+
+@pytest.fixture(autouse=True)
+def reset_cached_token():
+    yield
+    DatabricksTokenProvider.stop_background_refresh()
+    forget_process_token()
+
+
+def provider(retriever, clock, token_cache_dir=None) -> DatabricksTokenProvider:
+    return DatabricksTokenProvider(
+        "pat", "resource", True, retriever, clock, background_refresh=False, token_cache_dir=token_cache_dir
+    )
+
+
+def forget_process_token():
+    DatabricksTokenProvider._set_cached_token(None)
+    DatabricksTokenProvider._set_generated_at(None)
+
+
+def test_initial_token_outside_pipelines():
+    assert DatabricksTokenProvider("pat", "resource", False).get_token() == "pat"
+
+
+def test_token_is_fetched_again_once_expired():
+    retriever, clock = FakeRetriever(), FakeClock()
+    token_provider = provider(retriever, clock)
+
+    assert token_provider.get_token() == "token-1"
+    clock.now += timedelta(minutes=56)
+    assert not token_provider.is_expiring()
+    assert token_provider.get_token() == "token-1"
+
+    clock.now += timedelta(minutes=2)
+    assert token_provider.is_expiring()
+    assert token_provider.get_token() == "token-2"
+
+
+def test_background_refresh_renews_ahead_of_expiry():
+    retriever, clock = FakeRetriever(), FakeClock()
+    token_provider = provider(retriever, clock)
+    assert token_provider.get_token() == "token-1"
+    retriever.called.clear()
+
+    clock.now += timedelta(minutes=DatabricksTokenProvider.REFRESH_AFTER_MINS)
+    assert token_provider.get_token() == "token-1"
+    token_provider.start_background_refresh()
+
+    assert retriever.called.wait(5)
+    DatabricksTokenProvider.stop_background_refresh()
+    assert token_provider.get_token() == "token-2"
+
+
+def test_token_is_shared_between_processes(tmp_path):
+    clock = FakeClock()
+    first, second = FakeRetriever(), FakeRetriever()
+    assert provider(first, clock, str(tmp_path)).get_token() == "token-1"
+    token_file = next(tmp_path.glob("*.json"))
+    assert stat.S_IMODE(os.stat(token_file).st_mode) == 0o600
+
+    forget_process_token()  # as if in another process
+    clock.now += timedelta(minutes=10)
+    assert provider(second, clock, str(tmp_path)).get_token() == "token-1"
+    assert second.calls == 0
+
+    forget_process_token()
+    clock.now += timedelta(minutes=DatabricksTokenProvider.REFRESH_AFTER_MINS)
+    assert provider(second, clock, str(tmp_path)).get_token() == "token-1"
+    assert second.calls == 1
+
+
+def test_empty_token_is_neither_cached_nor_shared(tmp_path):
+    clock, retriever = FakeClock(), FakeRetriever()
+    token_provider = DatabricksTokenProvider(
+        "pat", "resource", True, lambda resource_id: "", clock, background_refresh=False, token_cache_dir=str(tmp_path)
+    )
+
+    with pytest.raises(RuntimeError):
+        token_provider.get_token()
+    assert not list(tmp_path.glob("*.json"))
+
+    assert provider(retriever, clock, str(tmp_path)).get_token() == "token-1"
+
+
+def test_concurrent_callers_share_one_refresh():
+    clock, release = FakeClock(), threading.Event()
+    retriever = FakeRetriever()
+
+    def slow_retriever(resource_id: str) -> str:
+        release.wait(5)
+        return retriever(resource_id)
+
+    token_provider = provider(slow_retriever, clock)
+    generation = token_provider.generation()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(token_provider.get_token_with_generation()))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert retriever.calls == 1
+    assert results == [("token-1", generation + 1)] * 8
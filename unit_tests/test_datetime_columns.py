@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+from common.utils.datetime_columns import *
+from common.utils.datetimes import DATETIME_FORMAT_OFFSET, isoformat_with_offset, string_to_datetime
+
+
+values = ["2024-07-31 17:00:30", "2024-01-15 08:05:00", None]
+
+
+@pytest.mark.parametrize("tz", [timezone.utc, "Europe/Lisbon", "America/New_York"])
+def test_string_column_to_datetime_matches_scalar(tz):
+    parsed = string_column_to_datetime(values, tz=tz)
+    assert list(parsed[:2]) == [string_to_datetime(v, tz=tz) for v in values[:2]]
+    assert pd.isna(parsed[2])
+
+
+@pytest.mark.parametrize("value", ["2024-10-27 01:30:00", "2024-03-31 01:30:00"])
+def test_dst_changes_match_scalar(value):
+    # repeated and skipped wall times in Lisbon
+    expected = string_to_datetime(value, tz="Europe/Lisbon").astimezone(timezone.utc)
+
+    parsed = string_column_to_datetime([value], tz="Europe/Lisbon")
+    replaced = replace_timezone_column(string_column_to_datetime([value]), "Europe/Lisbon")
+
+    assert parsed[0].tz_convert(timezone.utc) == expected
+    assert replaced[0].tz_convert(timezone.utc) == expected
+
+
+def test_string_column_to_datetime_converts_aware_values():
+    parsed = string_column_to_datetime(
+        ["2024-08-09T10:00:30+0100", "2024-08-09T10:00:30+0000"], format_=DATETIME_FORMAT_OFFSET, tz="UTC",
+    )
+    assert list(parsed) == [
+        datetime(2024, 8, 9, 9, 0, 30, tzinfo=timezone.utc), datetime(2024, 8, 9, 10, 0, 30, tzinfo=timezone.utc),
+    ]
+
+
+def test_string_column_to_datetime_iso_and_errors():
+    parsed = string_column_to_datetime(["2024-08-09T10:00:30Z", "2024-08-09", "nope"], format_=None, errors="coerce")
+    assert parsed[0] == datetime(2024, 8, 9, 10, 0, 30, tzinfo=timezone.utc)
+    assert parsed[1] == datetime(2024, 8, 9, tzinfo=timezone.utc)
+    assert pd.isna(parsed[2])
+    with pytest.raises(ValueError):
+        string_column_to_datetime(["nope"])
+
+
+def test_timezones_and_formatting():
+    utc = string_column_to_datetime(values[:2])
+    lisbon = change_timezone_column(utc, "Europe/Lisbon")
+    assert list(lisbon) == list(utc)
+    assert list(isoformat_with_offset_column(lisbon)) == [isoformat_with_offset(v) for v in lisbon]
+    assert list(datetime_column_to_string(replace_timezone_column(utc, "Europe/Lisbon"))) == values[:2]
+
+
+def test_normalize_datetime_columns():
+    rows = [{"id": 1, "created": "2024-07-31 17:00:30"}, {"id": 2, "created": "2024-01-15 08:05:00"}]
+    frame = normalize_datetime_columns(rows, ["created"], tz="Europe/Lisbon")
+    assert list(frame["id"]) == [1, 2]
+    assert list(frame["created"]) == [string_to_datetime(row["created"], tz="Europe/Lisbon") for row in rows]
+    assert rows[0]["created"] == "2024-07-31 17:00:30"
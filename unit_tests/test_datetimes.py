@@ -247,3 +247,49 @@ def test_datetime_methods():
     assert "2024-08-31T23:35:30+00:00" == isoformat_with_offset(_date)
     assert "2024-08-31 23:35:30+00:00" == isoformat_with_offset(_date, sep=" ")
     assert "2024-09-01 00:35:30+01:00" == isoformat_with_offset(_date2, sep=" ")
+
+
+@pytest.mark.parametrize("value, dt_str_format", [
+    ("2024-08-09 10:00:30", DATETIME_FORMAT_DEFAULT),
+    ("2024-8-9 10:0:30", DATETIME_FORMAT_DEFAULT),
+    ("2024-08-09t10:00:30", DATETIME_FORMAT_ISO),
+    ("2024-08-09T10:00:30Z", DATETIME_FORMAT_OFFSET),
+    ("2024-08-09T10:00:30+0130", DATETIME_FORMAT_OFFSET),
+    ("2024-08-09T10:00:30-01:30", DATETIME_FORMAT_OFFSET),
+    ("08 09/2024 30-00:10", "%m %d/%Y %S-%M:%H"),
+])
+def test_compare_parses_like_strptime(value, dt_str_format):
+    dtc = DatetimeCompare(datetime.strptime(value, dt_str_format), dt_str_format=dt_str_format)
+    assert dtc == value
+
+
+def test_compare_keeps_format_order():
+    dtc = DateCompare(date(2024, 2, 1), timedelta(days=20), timedelta(days=20), dt_str_format=["%d/%m/%Y", "%m/%d/%Y"])
+
+    assert dtc == "02/13/2024"  # only fits the second format
+    assert dtc == "01/02/2024"  # fits both, read with the first one as 1 February
+    assert dtc != "01/04/2024"
+
+
+def test_compare_falls_back_to_strptime(monkeypatch):
+    import common.utils.datetimes as datetimes
+
+    class _StrictIsoDatetime(datetime):
+        # like fromisoformat before Python 3.11, which didn't know 'Z' or offsets without a colon
+        @classmethod
+        def fromisoformat(cls, value):
+            raise ValueError(f"Invalid isoformat string: '{value}'")
+
+    monkeypatch.setattr(datetimes, "datetime", _StrictIsoDatetime)
+    dtc = DatetimeCompare(_StrictIsoDatetime(2024, 8, 9, 10, 0, 30, tzinfo=timezone.utc), dt_str_format=DATETIME_FORMAT_OFFSET)
+
+    assert dtc == "2024-08-09T10:00:30Z"
+    assert dtc == "2024-08-09T11:30:30+0130"
+
+
+def test_compare_retries_the_last_format_after_an_earlier_one_fails():
+    dtc = DatetimeCompare(datetime(2024, 1, 31, 10, 0), dt_str_format=["%Y-%m-%d %H:%M:%S", "%Y-%d-%m %H:%M:%S"])
+
+    # the month doesn't fit the first format but looks like it could
+    assert dtc == "2024-31-01 10:00:00"
+    assert dtc == "2024-31-01 10:00:00"
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Union
+
+import pytest
+
+from common.databricks.delta_types import dataclass_schema, delta_type
+
+
+@dataclass
+class Inner:
+    name: str = ""
+
+
+@dataclass
+class Record:
+    id: int
+    flag: bool = False
+    amount: Decimal = Decimal(0)
+    ratio: Optional[float] = None
+    created_at: datetime | None = None
+    day: date = None
+    tags: List[str] = field(default_factory=list)
+    extra: dict[str, Any] = field(default_factory=dict)
+    inner: Inner = None
+    anything: Any = "text"
+    unknown: Any = None
+
+
+@pytest.mark.parametrize("annotation, expected", [
+    (bool, "BOOLEAN"),
+    (int, "LONG"),
+    (float, "DOUBLE"),
+    (str, "STRING"),
+    (bytes, "BINARY"),
+    (Decimal, "DECIMAL(16,6)"),
+    (datetime, "TIMESTAMP"),
+    (date, "DATE"),
+    (Optional[int], "LONG"),
+    (Union[int, str], "STRING"),
+    (list[int], "ARRAY<STRING>"),
+    (dict, "STRING"),
+])
+def test_delta_type(annotation, expected):
+    assert delta_type(annotation) == expected
+
+
+def test_dataclass_schema():
+    assert dataclass_schema(Record) == {
+        "id": "LONG",
+        "flag": "BOOLEAN",
+        "amount": "DECIMAL(16,6)",
+        "ratio": "DOUBLE",
+        "created_at": "TIMESTAMP",
+        "day": "DATE",
+        "tags": "ARRAY<STRING>",
+        "extra": "STRING",
+        "inner": "STRING",
+        "anything": "STRING",
+        "unknown": "STRING",
+    }
+    assert dataclass_schema(Record) is dataclass_schema(Record)
@@ -0,0 +1,40 @@
+import pytest
+
+from common.assertions.compare import assert_equal_complex_object
+from common.assertions.diff import diff
+
+
+def test_diff_collects_all_differences():
+    expected = {"a": 1, "b": {"c": [1, 2, 3]}, "d": "x", "rows": [{"id": 1, "v": 1}, {"id": 2, "v": 2}]}
+    received = {"a": 2, "b": {"c": [3, 2, 4]}, "rows": [{"id": 2, "v": 2}, {"id": 1, "v": 5}]}
+
+    report = diff(expected, received)
+
+    assert [str(difference) for difference in report.differences] == [
+        "expected.a: 1 not equal to received.a = 2",
+        "expected.b.c[0]: 1 not equal to received.b.c[2] = 4",
+        "expected.d: is not in dict received",
+        "expected.rows[0].v: 1 not equal to received.rows[1].v = 5",
+    ]
+
+
+def test_diff_is_capped():
+    report = diff(list(range(10)), list(range(10, 20)), max_differences=3)
+
+    assert len(report.differences) == 3
+    assert report.render().startswith("3 differences, stopped at 3")
+
+
+def test_diff_without_same_len_allows_extra_elements():
+    assert not diff([1, 2], [3, 2, 1], same_len=False)
+
+
+def test_assert_equal_complex_object_reports_everything():
+    with pytest.raises(AssertionError) as error:
+        assert_equal_complex_object({"a": 1, "b": 2}, {"a": 3, "b": 4}, fail_fast=False)
+
+    assert str(error.value).splitlines() == [
+        "expected != received: 2 differences",
+        "  expected.a: 1 not equal to received.a = 3",
+        "  expected.b: 2 not equal to received.b = 4",
+    ]
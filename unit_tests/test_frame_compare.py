@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from common.assertions.frame_compare import assert_equal_frames, compare_frames
+
+
+def test_compare_frames():
+    expected = [
+        {"id": 1, "amount": 1.0, "at": "2024-10-09T10:00:00Z", "name": "a"},
+        {"id": 2, "amount": 2.0, "at": "2024-10-09T11:00:00Z", "name": "b"},
+        {"id": 3, "amount": 3.0, "at": None, "name": "c"},
+    ]
+    received = pd.DataFrame([
+        {"id": 2, "amount": Decimal("2.004"), "at": datetime(2024, 10, 9, 11, 0, 30, tzinfo=timezone.utc), "name": "x"},
+        {"id": 1, "amount": Decimal("1.5"), "at": datetime(2024, 10, 9, 10, 0, 20), "name": "a"},
+        {"id": 4, "amount": 4.0, "at": None, "name": "d"},
+    ])
+
+    result = compare_frames(
+        expected, received, "id", tolerances={"amount": 0.01}, datetime_windows={"at": timedelta(minutes=1)}
+    )
+
+    assert result.missing_keys == [(3,)]
+    assert result.extra_keys == [(4,)]
+    assert [(m.key, m.column, m.expected, m.received) for m in result.mismatches] == [
+        ((1,), "amount", 1.0, Decimal("1.5")),
+        ((2,), "name", "b", "x"),
+    ]
+
+
+def test_assert_equal_frames_on_composite_keys():
+    rows = [{"a": i % 3, "b": i, "v": str(i)} for i in range(30)]
+
+    assert_equal_frames(rows, list(reversed(rows)), ["a", "b"])
+    with pytest.raises(AssertionError, match=r"1 columns missing from received:\n  v"):
+        assert_equal_frames(rows, [{"a": r["a"], "b": r["b"]} for r in rows], ["a", "b"])
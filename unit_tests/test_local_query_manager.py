@@ -0,0 +1,267 @@
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+
+from common.databricks import query_manager as query_manager_module
+from common.databricks.local_query_manager import LocalQueryManager
+from common.databricks.query_manager import QueryManager, QueryManagerConfig, QueryManagerFactory
+
+
+@dataclass
+class Record:
+    id: int
+    name: str = ""
+    amount: Decimal = Decimal("0")
+    created_at: Optional[datetime] = None
+    active: bool = False
+    tags: list = field(default_factory=list)
+
+
+@pytest.fixture
+def qm(tmp_path) -> LocalQueryManager:
+    config = QueryManagerConfig(
+        hostname="",
+        http_path="",
+        token_provider=None,
+        logger=logging.getLogger("test"),
+        backend="local",
+        local_database_path=str(tmp_path / "local.db"),
+    )
+    query_manager = QueryManagerFactory(config).get_query_manager_instance()
+    query_manager.create_table_from_dataclass("cat", "db", "records", Record, storage_account_name="")
+    yield query_manager
+    query_manager.close()
+    QueryManager._update_queue.clear()
+
+
+def test_factory_selects_local_backend(qm):
+    assert isinstance(qm, LocalQueryManager)
+
+
+def test_append_and_get_table(qm):
+    created_at = datetime(2024, 8, 9, 10, 0, 30, tzinfo=timezone.utc)
+    qm.append_to_table("db", "records", [
+        Record(1, "it's", Decimal("1.5"), created_at, True, ["a"]),
+        Record(2, "b"),
+    ])
+
+    rows = qm.get_table(catalog="cat", database="db", table="records", order_by=["id"])
+
+    assert rows == [
+        {"id": 1, "name": "it's", "amount": Decimal("1.5"), "created_at": created_at, "active": True, "tags": '["a"]'},
+        {"id": 2, "name": "b", "amount": Decimal("0"), "created_at": None, "active": False, "tags": "[]"},
+    ]
+
+
+def test_staged_append(qm, tmp_path):
+    qm.config.staging_location = str(tmp_path / "staging")
+    qm.config.staging_local_dir = str(tmp_path / "local")
+
+    qm.append_to_table("db", "records", [Record(1, "a", Decimal("1.5")), Record(2, "b")], staged=True)
+
+    rows = qm.get_table(catalog="cat", database="db", table="records", order_by=["id"])
+    assert [(row["id"], row["name"], row["amount"]) for row in rows] == [(1, "a", Decimal("1.5")), (2, "b", Decimal("0"))]
+    assert not list((tmp_path / "staging").iterdir())
+    assert not list((tmp_path / "local").iterdir())
+
+
+@pytest.mark.parametrize("staging_location", ["abfss://staging@account.dfs.core.windows.net/qm", "dbfs:/tmp/qm", "/tmp/qm"])
+def test_staged_append_needs_a_volume(staging_location):
+    config = QueryManagerConfig(
+        hostname="", http_path="", token_provider=None, logger=logging.getLogger("test"), staging_location=staging_location
+    )
+
+    with pytest.raises(ValueError, match="/Volumes/"):
+        QueryManager(config).append_to_table("db", "records", [Record(1)], staged=True)
+
+
+def test_metadata(qm):
+    assert qm.table_or_view_exists("db", "records")
+    assert qm.table_or_view_exists("cat.db", "RECORDS")
+    assert not qm.table_or_view_exists("db", "other")
+
+    qm.drop_database("db")
+
+    assert not qm.table_or_view_exists("db", "records")
+
+
+def test_table_created_elsewhere_is_found(qm):
+    assert not qm.table_or_view_exists("db", "others")
+
+    # its own caches, like a job writing to the same warehouse
+    LocalQueryManager(config=qm.config).create_table_from_dataclass("cat", "db", "others", Record, storage_account_name="")
+
+    assert qm.table_or_view_exists("db", "others")
+
+
+def test_cached_result_invalidated_by_writes(qm):
+    qm.append_to_table("db", "records", [Record(1)])
+    assert len(qm.get_table(catalog="cat", database="db", table="records", use_cache=True)) == 1
+
+    qm.append_to_table("db", "records", [Record(2)])
+    assert len(qm.get_table(catalog="cat", database="db", table="records", use_cache=True)) == 2
+
+    qm.clear_table("db", "records")
+    assert qm.get_table(catalog="cat", database="db", table="records", use_cache=True) == []
+
+
+def test_get_table_by_keys(qm):
+    qm.append_to_table("db", "records", [Record(i, f"n{i}") for i in range(50)])
+
+    result = qm.get_table_by_keys(
+        catalog="cat", database="db", table="records",
+        key_columns=["id"], keys=[1, 2, 99], max_statement_chars=60,
+    )
+
+    assert [row["name"] for row in result[1]] == ["n1"]
+    assert [row["name"] for row in result[2]] == ["n2"]
+    assert result[99] == []
+
+
+def test_process_update_queue(qm):
+    qm.create_table_from_dataclass("cat", "db", "others", Record, storage_account_name="")
+    qm.queue_for_update("db", "records", [Record(1), Record(2)])
+    qm.queue_for_update("db", "others", [Record(3)])
+
+    result = qm.process_update_queue()
+
+    assert result.all_successful
+    assert result.successful == {"db.records": 2, "db.others": 1}
+    assert len(qm.get_table(catalog="cat", database="db", table="others")) == 1
+
+
+def _fail_inserts(monkeypatch, statement: int, times: int) -> None:
+    """Make the `statement`-th INSERT (1 based) fail `times` times, on every QueryManager."""
+    execute_update = LocalQueryManager.execute_update
+    calls = {"inserts": 0, "failures": 0}
+
+    def _execute_update(self, query):
+        if query.startswith("INSERT"):
+            calls["inserts"] += 1
+            if calls["inserts"] == statement and calls["failures"] < times:
+                calls["failures"] += 1
+                calls["inserts"] -= 1
+                raise sqlite3.OperationalError("database is locked")
+        execute_update(self, query)
+
+    monkeypatch.setattr(LocalQueryManager, "execute_update", _execute_update)
+    monkeypatch.setattr(query_manager_module, "INSERT_CHUNK_SIZE", 2)
+
+
+def test_process_update_queue_resumes_from_failed_chunk(qm, monkeypatch):
+    _fail_inserts(monkeypatch, statement=2, times=1)
+    qm.queue_for_update("db", "records", [Record(i) for i in range(5)])
+
+    result = qm.process_update_queue()
+
+    assert result.successful == {"db.records": 5}
+    rows = qm.get_table(catalog="cat", database="db", table="records", order_by=["id"])
+    assert [row["id"] for row in rows] == [0, 1, 2, 3, 4]
+
+
+def test_process_update_queue_requeues_unwritten_records(qm, monkeypatch):
+    _fail_inserts(monkeypatch, statement=2, times=10)
+    records = [Record(i) for i in range(5)]
+    qm.queue_for_update("db", "records", records)
+
+    result = qm.process_update_queue(raise_on_failure=False)
+
+    assert not result.all_successful
+    assert str(result.failed["db.records"]) == "database is locked"
+    assert QueryManager._update_queue.items() == [("db.records", records[2:])]
+    assert QueryManager._update_queue.size == 3
+
+    monkeypatch.undo()
+    qm.process_update_queue()
+    rows = qm.get_table(catalog="cat", database="db", table="records", order_by=["id"])
+    assert [row["id"] for row in rows] == [0, 1, 2, 3, 4]
+    assert QueryManager._update_queue.size == 0
+
+
+def test_process_update_queue_requeues_on_any_error(qm, monkeypatch):
+    qm.queue_for_update("db", "records", [{"id": 1}])
+    qm.queue_for_update("db", "others", [{"id": 2}])
+
+    result = qm.process_update_queue(raise_on_failure=False)
+
+    assert set(result.failed) == {"db.records", "db.others"}
+    assert len(QueryManager._update_queue) == 2
+
+    def _crash(*args):
+        raise RuntimeError("crash")
+
+    monkeypatch.setattr(QueryManager, "_flush_table", _crash)
+    with pytest.raises(RuntimeError):
+        qm.process_update_queue()
+
+    assert len(QueryManager._update_queue) == 2
+    assert QueryManager._update_queue.size == 2
+
+
+def test_upsert_records(qm):
+    qm.append_to_table("db", "records", [Record(1, "a"), Record(2, "b")])
+
+    qm.upsert_records(
+        "db", "records", [Record(2, "old"), Record(2, "B"), Record(3, "c")], key_columns=["id"], max_statement_chars=300
+    )
+
+    rows = qm.get_table(catalog="cat", database="db", table="records", order_by=["id"])
+    assert [(row["id"], row["name"]) for row in rows] == [(1, "a"), (2, "B"), (3, "c")]
+
+
+def test_merge_sql(qm):
+    sql = QueryManager._merge_sql(qm, "db", "t", ["id", "name"], ["id"], values=["(1, 'a')"])
+
+    assert sql == (
+        "MERGE INTO db.t AS target USING (SELECT * FROM VALUES (1, 'a') AS source(id, name)) AS source "
+        "ON target.id = source.id WHEN MATCHED AND (NOT (target.name <=> source.name)) THEN UPDATE SET * "
+        "WHEN NOT MATCHED THEN INSERT *"
+    )
+
+
+def test_scan_table(qm):
+    qm.append_to_table("db", "records", [Record(i, f"n{i}") for i in range(10)])
+
+    scan = qm.scan_table(
+        catalog="cat", database="db", table="records", key_columns=["id"],
+        query_columns="name", page_size=4, prefetch=True,
+    )
+
+    assert [row["name"] for row in scan] == [f"n{i}" for i in range(10)]
+    assert scan.pages_fetched == 3
+
+
+def test_get_table_data_is_incremental(qm, monkeypatch):
+    context = SimpleNamespace()
+    start = datetime(2024, 8, 9, 10, 0, tzinfo=timezone.utc)
+    qm.append_to_table("db", "records", [Record(1, created_at=start), Record(2, created_at=start + timedelta(hours=1))])
+
+    rows = qm.get_table_data(context=context, database="db", table="records", after_col_name="created_at",
+                             after_datetime=start)
+    assert [row["id"] for row in rows] == [2]
+
+    qm.append_to_table("db", "records", [Record(3, created_at=start + timedelta(hours=1)),
+                                         Record(4, created_at=start + timedelta(hours=2))])
+    queries = []
+    get_table_with_query = qm.get_table_with_query
+
+    def _get_table_with_query(query, use_cache=False):
+        queries.append(query)
+        return get_table_with_query(query, use_cache)
+
+    monkeypatch.setattr(qm, "get_table_with_query", _get_table_with_query)
+
+    rows = qm.get_table_data(context=context, database="db", table="records", after_col_name="created_at",
+                             after_datetime=start + timedelta(minutes=30))
+    assert sorted(row["id"] for row in rows) == [2, 3, 4]
+    assert queries == ["SELECT * FROM db.records WHERE created_at >= '2024-08-09T11:00:00+00:00'"]
+
+    rows = qm.get_table_data(context=context, database="db", table="records", after_col_name="created_at",
+                             after_datetime=start - timedelta(hours=1))
+    assert sorted(row["id"] for row in rows) == [1, 2, 3, 4]
@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from common.assertions.compare import assert_equal_partitioned
+from common.assertions.diff import diff
+from common.assertions.parallel_compare import diff_parallel
+
+
+ROWS = [{"id": i, "v": i % 7} for i in range(40)]
+
+
+def changed_rows():
+    received = [dict(row) for row in reversed(ROWS) if row["id"] != 5]
+    received[0]["v"] = "x"
+    received.append({"id": 99, "v": 0})
+    return received
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_keyed_lists_match_sequential_result(workers):
+    report = diff_parallel(ROWS, changed_rows(), key_columns="id", workers=workers, min_partition_size=5)
+
+    assert [str(d) for d in report.differences] == [
+        "expected[5]: {'id': 5, 'v': 5} is not inside received",
+        "expected[39].v: 4 not equal to received[0].v = 'x'",
+        "received[39]: {'id': 99, 'v': 0} was not expected",
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_keys_of_different_types_that_are_equal(workers):
+    expected = [{"id": i, "v": i} for i in range(40)]
+    as_types = (Decimal, float, np.int64, int)
+    received = [{"id": as_types[i % 4](i), "v": i} for i in range(40)]
+
+    report = diff_parallel(expected, received, key_columns="id", workers=workers, min_partition_size=5)
+
+    assert report.differences == []
+
+
+def test_dicts_and_ordered_lists():
+    expected = {f"k{i}": [i, {"a": i}] for i in range(20)}
+    received = {**expected, "k3": [3, {"a": 0}]}
+    del received["k10"]
+
+    report = diff_parallel(expected, received, workers=2, min_partition_size=5)
+    assert [str(d) for d in report.differences] == [
+        "expected.k3[1].a: 3 not equal to received.k3[1].a = 0",
+        "expected.k10: is not in dict received",
+    ]
+    assert report.differences == diff(expected, received).differences
+
+    report = diff_parallel(list(range(20)), [*range(10), -1, *range(11, 20)], ordered=True, workers=2, min_partition_size=5)
+    assert [str(d) for d in report.differences] == ["expected[10]: 10 not equal to received[10] = -1"]
+
+
+def test_assert_equal_partitioned():
+    assert_equal_partitioned(ROWS, list(reversed(ROWS)), key_columns=["id"], workers=2)
+    with pytest.raises(AssertionError, match="3 differences"):
+        assert_equal_partitioned(ROWS, changed_rows(), key_columns=["id"], workers=2)
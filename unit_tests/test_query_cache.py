@@ -0,0 +1,110 @@
+import pytest
+
+from common.databricks.query_cache import QueryResultCache, normalize_sql, referenced_tables, written_tables
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+ROWS = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+
+
+def test_normalize_sql():
+    assert normalize_sql("  SELECT *\n  FROM  db.t ;") == "SELECT * FROM db.t"
+    assert normalize_sql("SELECT * FROM db.t WHERE name = 'a  b'") != normalize_sql("SELECT * FROM db.t WHERE name = 'a b'")
+    assert normalize_sql("SELECT  'x\n  y' ,  \"a  b\"") == "SELECT 'x\n  y' , \"a  b\""
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT * FROM cat.db.t", {("cat", "db", "t")}),
+    ("SELECT * FROM db.a JOIN `db`.`b` ON a.id = b.id", {("db", "a"), ("db", "b")}),
+    ("SELECT * FROM (SELECT * FROM db.t)", {("db", "t")}),
+    ("SELECT * FROM db.a, db.b", {("db", "a"), ("db", "b")}),
+    ("SELECT * FROM db.a x, db.b AS y WHERE x.id IN (1, 2) GROUP BY x.id, y.id", {("db", "a"), ("db", "b")}),
+])
+def test_referenced_tables(query, expected):
+    assert referenced_tables(query) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("INSERT INTO db.t (id) VALUES (1);", {("db", "t")}),
+    ("DELETE FROM db.t", {("db", "t")}),
+    ("MERGE INTO db.t USING src ON db.t.id = src.id", {("db", "t")}),
+    ("SELECT * FROM db.t", set()),
+])
+def test_written_tables(query, expected):
+    assert written_tables(query) == expected
+
+
+def test_cache_hit_returns_copies():
+    cache = QueryResultCache()
+    cache.put("SELECT * FROM db.t", ROWS)
+
+    cached = cache.get("SELECT *   FROM db.t;")
+    assert cached == ROWS
+    cached[0]["name"] = "changed"
+    assert cache.get("SELECT * FROM db.t") == ROWS
+    assert cache.hits == 2
+
+
+def test_cache_ttl():
+    clock = FakeClock()
+    cache = QueryResultCache(ttl_secs=10, clock=clock)
+    cache.put("SELECT * FROM db.t", ROWS)
+
+    clock.now = 10
+    assert cache.get("SELECT * FROM db.t") == ROWS
+    clock.now = 10.1
+    assert cache.get("SELECT * FROM db.t") is None
+    assert len(cache) == 0
+
+
+def test_cache_lru_eviction():
+    cache = QueryResultCache(max_entries=2)
+    cache.put("SELECT * FROM db.a", ROWS)
+    cache.put("SELECT * FROM db.b", ROWS)
+    cache.get("SELECT * FROM db.a")
+    cache.put("SELECT * FROM db.c", ROWS)
+
+    assert cache.get("SELECT * FROM db.b") is None
+    assert cache.get("SELECT * FROM db.a") == ROWS
+    assert cache.get("SELECT * FROM db.c") == ROWS
+
+
+@pytest.mark.parametrize("statement", [
+    "INSERT INTO db.a (id) VALUES (1);",
+    "DELETE FROM db.a",
+    "DROP DATABASE IF EXISTS db CASCADE",
+])
+def test_cache_invalidated_by_writes(statement):
+    cache = QueryResultCache()
+    cache.put("SELECT * FROM cat.db.a", ROWS)
+    cache.put("SELECT * FROM other.b", ROWS)
+
+    cache.invalidate_for_statement(statement)
+
+    assert cache.get("SELECT * FROM cat.db.a") is None
+    assert cache.get("SELECT * FROM other.b") == ROWS
+
+
+def test_cache_invalidated_by_write_to_any_table_in_from_list():
+    cache = QueryResultCache()
+    cache.put("SELECT * FROM db.a, db.b", ROWS)
+
+    cache.invalidate_for_statement("INSERT INTO db.b (id) VALUES (1)")
+
+    assert cache.get("SELECT * FROM db.a, db.b") is None
+
+
+def test_cache_put_skipped_after_invalidation():
+    cache = QueryResultCache()
+    generation = cache.generation
+    cache.invalidate_table("db.a")
+    cache.put("SELECT * FROM db.a", ROWS, generation=generation)
+
+    assert cache.get("SELECT * FROM db.a") is None
@@ -0,0 +1,137 @@
+import logging
+import sqlite3
+from dataclasses import dataclass
+
+import pytest
+
+from common.databricks.local_query_manager import LocalQueryManager
+from common.databricks.query_manager import QueryManager, QueryManagerConfig, QueryManagerFactory
+from common.databricks.retry_policy import RetryPolicy
+
+
+@dataclass
+class Record:
+    id: int
+
+
+@pytest.fixture
+def qm(tmp_path) -> QueryManager:
+    config = QueryManagerConfig(
+        hostname="",
+        http_path="",
+        token_provider=None,
+        logger=logging.getLogger("test"),
+        retry_policy=RetryPolicy(sleep=lambda secs: None),
+        update_queue_retries=2,
+        backend="local",
+        local_database_path=str(tmp_path / "local.db"),
+    )
+    query_manager = QueryManagerFactory(config).get_query_manager_instance()
+    yield query_manager
+    query_manager.close()
+    QueryManager._update_queue.clear()
+
+
+def count_inserts(monkeypatch) -> list[str]:
+    inserts = []
+    execute = LocalQueryManager._execute
+
+    def _execute(self, query, fetch):
+        if query.startswith("INSERT"):
+            inserts.append(query)
+        return execute(self, query, fetch)
+
+    monkeypatch.setattr(LocalQueryManager, "_execute", _execute)
+    return inserts
+
+
+def test_flush_does_not_retry_fatal_errors(qm, monkeypatch):
+    inserts = count_inserts(monkeypatch)
+    qm.queue_for_update("db", "missing", [Record(1), Record(2)])
+
+    result = qm.process_update_queue(raise_on_failure=False)
+
+    assert isinstance(result.failed["db.missing"], sqlite3.OperationalError)
+    assert len(inserts) == 1
+    assert QueryManager._update_queue.items() == [("db.missing", [Record(1), Record(2)])]
+
+
+def test_flush_retries_retryable_errors(qm, monkeypatch):
+    qm.execute_update("CREATE TABLE db.records (id INT)")
+    inserts = count_inserts(monkeypatch)
+    execute_update = LocalQueryManager.execute_update
+    failures = []
+
+    def _execute_update(self, query):
+        if query.startswith("INSERT") and len(failures) < 2:
+            failures.append(query)
+            raise sqlite3.OperationalError("database is locked")
+        execute_update(self, query)
+
+    monkeypatch.setattr(LocalQueryManager, "execute_update", _execute_update)
+    qm.queue_for_update("db", "records", [Record(1)])
+
+    result = qm.process_update_queue()
+
+    assert result.successful == {"db.records": 1}
+    assert len(failures) == 2 and len(inserts) == 1
+
+
+@pytest.fixture
+def orders(qm) -> QueryManager:
+    qm.execute_update("CREATE TABLE db.orders (customer INT, id INT, name TEXT)")
+    qm.execute_update(
+        "INSERT INTO db.orders (customer, id, name) VALUES "
+        + ", ".join(f"({customer}, {i}, 'c{customer}o{i}')" for customer in (1, 2) for i in range(10))
+    )
+    return qm
+
+
+def record_queries(monkeypatch, qm) -> list[str]:
+    queries = []
+    get_table_with_query = qm.get_table_with_query
+
+    def _get_table_with_query(query, use_cache=False):
+        queries.append(query)
+        return get_table_with_query(query, use_cache)
+
+    monkeypatch.setattr(qm, "get_table_with_query", _get_table_with_query)
+    return queries
+
+
+def test_get_table_by_keys_splits_by_statement_size(orders, monkeypatch):
+    queries = record_queries(monkeypatch, orders)
+
+    result = orders.get_table_by_keys(
+        catalog="cat", database="db", table="orders", key_columns=["id"], keys=range(10),
+        where_clauses={"customer": 1}, max_statement_chars=80,
+    )
+
+    assert len(queries) > 1 and all(len(query) <= 80 for query in queries)
+    assert {key: [row["name"] for row in rows] for key, rows in result.items()} == {i: [f"c1o{i}"] for i in range(10)}
+
+
+def test_get_table_by_keys_composite_and_missing_keys(orders):
+    result = orders.get_table_by_keys(
+        catalog="cat", database="db", table="orders", key_columns=["customer", "id"], keys=[(1, 2), (2, 2), (3, 2)],
+    )
+
+    assert {key: [row["name"] for row in rows] for key, rows in result.items()} == {
+        (1, 2): ["c1o2"], (2, 2): ["c2o2"], (3, 2): [],
+    }
+
+
+def test_get_table_by_keys_selects_the_key_columns(orders, monkeypatch):
+    queries = record_queries(monkeypatch, orders)
+
+    result = orders.get_table_by_keys(
+        catalog="cat", database="db", table="orders", key_columns=["customer", "id"], keys=[(2, 5)], query_columns="name",
+    )
+
+    assert queries[0].startswith("SELECT name, customer, id FROM")
+    assert result == {(2, 5): [{"name": "c2o5", "customer": 2, "id": 5}]}
+
+
+def test_get_table_by_keys_rejects_keys_of_the_wrong_size(orders):
+    with pytest.raises(ValueError, match="doesn't match the key columns"):
+        orders.get_table_by_keys(catalog="cat", database="db", table="orders", key_columns=["customer", "id"], keys=[(1,)])
@@ -0,0 +1,104 @@
+import sqlite3
+from logging import WARNING
+
+import pytest
+
+from common.databricks.query_manager import QueryManagerConfig, QueryManagerFactory
+from common.databricks.query_profiler import QueryProfiler, fingerprint_sql
+
+
+class FakeLogger:
+    def __init__(self):
+        self.messages: list[tuple[int, str]] = []
+
+    def log(self, level: int, message: str) -> None:
+        self.messages.append((level, message))
+
+    def warning(self, message: str) -> None:
+        self.log(WARNING, message)
+
+    def warnings(self) -> list[str]:
+        return [message for level, message in self.messages if level == WARNING]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("SELECT * FROM db.t WHERE id = 42 AND name = 'it''s';", "SELECT * FROM db.t WHERE id = ? AND name = ?"),
+    ("INSERT INTO db.t (id, name) VALUES (1, 'a'), (2, 'b')", "INSERT INTO db.t (id, name) VALUES (?)"),
+    ("SELECT  *\n FROM db.t2 WHERE x > -1.5", "SELECT * FROM db.t2 WHERE x > ?"),
+])
+def test_fingerprint_sql(query, expected):
+    assert fingerprint_sql(query) == expected
+
+
+def test_rollup_per_scope():
+    profiler = QueryProfiler(enabled=True)
+    profiler.start_scope("first")
+    profiler.record("SELECT * FROM db.t WHERE id = 1", 1.0, rows=[{"name": "abc"}])
+    profiler.record("SELECT * FROM db.t WHERE id = 2", 2.0, reconnected=True)
+    profiler.record("DELETE FROM db.t", 0.5, failed=True)
+
+    profiler.start_scope("second")
+    profiler.record("DELETE FROM db.t", 0.1)
+
+    first = profiler.rollup("first")
+    assert [(s.fingerprint, s.count) for s in first] == [("SELECT * FROM db.t WHERE id = ?", 2), ("DELETE FROM db.t", 1)]
+    assert (first[0].total_secs, first[0].max_secs, first[0].rows, first[0].bytes_fetched) == (3.0, 2.0, 1, 3)
+    assert (first[0].reconnects, first[1].failures) == (1, 1)
+    assert [s.count for s in profiler.rollup()] == [1]
+
+    profiler.start_scope("first")
+    assert profiler.rollup() == []
+    assert len(profiler.recent) == 4
+
+    profiler.clear()
+    assert profiler.rollup("second") == [] and not profiler.recent
+
+
+def test_render_rollup():
+    profiler = QueryProfiler(enabled=True)
+    assert profiler.render_rollup() == ""
+
+    for table in ("a", "b", "c"):
+        profiler.record(f"SELECT * FROM db.{table}", 1.0)
+
+    lines = profiler.render_rollup(top=2, width=16).splitlines()
+
+    assert lines[0] == "3 queries in 3.00s (3 distinct)"
+    assert lines[1].split() == ["count", "total", "max", "rows", "bytes", "recon", "fail", "query"]
+    assert lines[2].endswith("  SELECT * FROM db")
+    assert len(lines) == 5 and lines[4] == "... and 1 more"
+
+
+def test_slow_query_warning():
+    logger = FakeLogger()
+    profiler = QueryProfiler(slow_query_secs=1.0, logger=logger)
+
+    profiler.record("SELECT 1", 0.5)
+    profiler.record("SELECT 2", 1.5, rows=[(1,)], reconnected=True)
+
+    assert profiler.enabled
+    assert logger.warnings() == ["Slow query 1.50s, 1 rows, 8 bytes, reconnected: SELECT 2"]
+
+
+def test_query_manager_profiles_queries(tmp_path):
+    logger = FakeLogger()
+    config = QueryManagerConfig(
+        hostname="", http_path="", token_provider=None, logger=logger,
+        backend="local", local_database_path=str(tmp_path / "local.db"), slow_query_secs=0,
+    )
+    qm = QueryManagerFactory(config).get_query_manager_instance()
+    qm.profiler.start_scope("scenario")
+    try:
+        qm.execute_update("CREATE TABLE db.t (id INT)")
+        qm.execute_update("INSERT INTO db.t (id) VALUES (1), (2)")
+        qm.execute_query("SELECT * FROM db.t WHERE id > 0")
+        with pytest.raises(sqlite3.OperationalError, match="no such table: db.missing"):
+            qm.execute_query("SELECT * FROM db.missing")
+    finally:
+        qm.close()
+
+    stats = {s.fingerprint: s for s in qm.profiler.rollup("scenario")}
+    assert stats["SELECT * FROM db.t WHERE id > ?"].rows == 2
+    assert stats["INSERT INTO db.t (id) VALUES (?)"].count == 1
+    assert stats["SELECT * FROM db.missing"].failures == 1
+    assert len([message for message in logger.warnings() if message.startswith("Slow query")]) == 4
@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+from databricks.sql.exc import RequestError, ServerOperationError
+
+from common.databricks.retry_policy import ErrorClass, RetryPolicy
+
+
+@pytest.mark.parametrize("exc, expected", [
+    (ServerOperationError("[PARSE_SYNTAX_ERROR] Syntax error at or near 'SELEC'"), ErrorClass.FATAL),
+    (ServerOperationError("[TABLE_OR_VIEW_NOT_FOUND] The table or view `db`.`t` cannot be found"), ErrorClass.FATAL),
+    (ServerOperationError("Invalid SessionHandle: SessionHandle [abc]"), ErrorClass.RECONNECT),
+    (ServerOperationError("[DELTA_CONCURRENT_APPEND] ConcurrentAppendException"), ErrorClass.RETRYABLE),
+    (ServerOperationError("[INVALID_HANDLE.SESSION_NOT_FOUND] The handle 01ef is invalid"), ErrorClass.RECONNECT),
+    (ServerOperationError("[TEMPORARILY_UNAVAILABLE] The service is temporarily unavailable"), ErrorClass.RETRYABLE),
+    # messages echoing the statement or object names, with what looks like a status or a retryable phrase
+    (ServerOperationError(
+        "[PARSE_SYNTAX_ERROR] Syntax error at or near 'WHERE'. SQLSTATE: 42601 (line 1, pos 30)\n\n== SQL ==\n"
+        "SELECT * FROM db.t WHRE id = 4031"
+    ), ErrorClass.FATAL),
+    (ServerOperationError(
+        "[TABLE_OR_VIEW_NOT_FOUND] The table or view `db`.`orders_2024_0503` cannot be found. SQLSTATE: 42P01"
+    ), ErrorClass.FATAL),
+    (ServerOperationError(
+        "[UNRESOLVED_COLUMN.WITH_SUGGESTION] A column or function parameter with name `timed out` cannot be resolved."
+    ), ErrorClass.FATAL),
+    (ServerOperationError("[INSUFFICIENT_PERMISSIONS] User does not have SELECT on table `db`.`t_401`"), ErrorClass.FATAL),
+    (ServerOperationError("Table or view not found: db.orders_0503; line 1 pos 14"), ErrorClass.FATAL),
+    (RequestError("HTTP 429 Too Many Requests"), ErrorClass.RETRYABLE),
+    (RequestError("Error during request to server", context={"http-code": 503}), ErrorClass.RETRYABLE),
+    (RequestError("Error during request to server", context={"http-code": 403}), ErrorClass.RECONNECT),
+    (RequestError("Error during request to server"), ErrorClass.RECONNECT),
+    (ConnectionResetError("peer closed"), ErrorClass.RECONNECT),
+    (sqlite3.OperationalError("near \"SELEC\": syntax error"), ErrorClass.FATAL),
+    (sqlite3.OperationalError("database is locked"), ErrorClass.RETRYABLE),
+    (TypeError("unsupported operand"), ErrorClass.FATAL),
+])
+def test_classify(exc, expected):
+    assert RetryPolicy().classify(exc) == expected
+
+
+def test_delay_is_bounded_exponential():
+    policy = RetryPolicy(base_delay_secs=1, max_delay_secs=5, jitter=0)
+
+    assert [policy.delay(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+
+
+def test_delay_jitter():
+    policy = RetryPolicy(base_delay_secs=1, jitter=0.5)
+
+    assert all(0.5 <= policy.delay(1) <= 1.5 for _ in range(100))
@@ -0,0 +1,33 @@
+import pytest
+
+from common.assertions.compare import ExpectedFieldMissingError, UnexpectedTypeError, assert_expected_type
+from common.assertions.schema import ListOf, compile_schema
+
+
+def test_assert_expected_type_does_not_mutate_expected():
+    expected = [str, None]
+
+    assert_expected_type(expected, None)
+    assert_expected_type(expected, "a")
+    with pytest.raises(UnexpectedTypeError):
+        assert_expected_type(expected, 1)
+    assert expected == [str, None]
+
+
+def test_compiled_schema():
+    validator = compile_schema({"id": int, "name": [str, None], "tags": ListOf(str), "parent": [{"id": int}, None]})
+
+    validator.validate_all([
+        {"id": 1, "name": None, "tags": ["a"], "parent": None, "extra": 1},
+        {"id": 2, "name": "b", "tags": [], "parent": {"id": 1}},
+    ])
+    with pytest.raises(UnexpectedTypeError, match=r"Expected response.tags\[\] to be a \[<class 'str'>\].*element 1"):
+        validator.validate({"id": 1, "name": None, "tags": ["a", 2], "parent": None})
+    with pytest.raises(ExpectedFieldMissingError, match=r"response.parent.id is not in response.parent"):
+        validator.validate({"id": 1, "name": None, "tags": [], "parent": {}})
+
+
+def test_exact_schema_rejects_subclasses():
+    assert compile_schema(int).validate(True) is None
+    with pytest.raises(UnexpectedTypeError):
+        compile_schema(int, exact=True).validate(True)
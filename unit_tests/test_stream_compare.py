@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from common.assertions.stream_compare import assert_equal_streams, compare_streams
+from common.utils.files import iter_jsonl
+
+
+def rows(ids, **changes):
+    for i in ids:
+        yield {"id": i, "v": changes.get(str(i), i)}
+
+
+def test_lockstep_within_window():
+    assert not compare_streams(rows([1, 2, 3, 4]), rows([2, 1, 4, 3]), window=2)
+
+    report = compare_streams(rows(range(100)), rows(range(100), **{"50": "x"}), window=3)
+
+    assert [str(d) for d in report.differences] == ["expected[50].v: 50 not equal to received[50].v = 'x'"]
+
+
+def test_lockstep_reports_unmatched_elements():
+    report = compare_streams(rows([1, 2, 3]), rows([1, 3]), window=1)
+
+    assert [str(d) for d in report.differences] == ["expected[1]: {'id': 2, 'v': 2} is not inside received"]
+
+
+def test_merge_join():
+    report = compare_streams(rows([1, 2, 4, 5]), rows([1, 3, 4, 5], **{"5": 0}), key_columns="id")
+
+    assert [str(d) for d in report.differences] == [
+        "expected[2]: {'id': 2, 'v': 2} is not inside received",
+        "received[3]: {'id': 3, 'v': 3} was not expected",
+        "expected[5].v: 5 not equal to received[5].v = 0",
+    ]
+    with pytest.raises(ValueError, match="not sorted"):
+        compare_streams(rows([2, 1]), rows([1, 2]), key_columns=["id"])
+
+
+def test_jsonl_files(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    path.write_text("\n".join(json.dumps(row) for row in rows(range(10))) + "\n\n")
+
+    assert_equal_streams(iter_jsonl(str(path)), rows(range(10)), key_columns="id")
@@ -0,0 +1,48 @@
+import pytest
+
+from common.databricks.table_scan import TableScan, keyset_predicate
+
+
+def test_keyset_predicate():
+    assert keyset_predicate(["a"], ["1"]) == "a > 1"
+    assert keyset_predicate(["a", "b"], ["1", "'x'"]) == "(a > 1) OR (a = 1 AND b > 'x')"
+
+
+class FakeTable:
+    def __init__(self, ids, fail_on_call=None):
+        self.ids = ids
+        self.calls = 0
+        self.fail_on_call = fail_on_call
+        self.queries = []
+
+    def fetch(self, query: str) -> list[dict]:
+        self.calls += 1
+        self.queries.append(query)
+        if self.calls == self.fail_on_call:
+            raise ConnectionError("lost")
+        after = int(query.split("id > ")[1].split(")")[0]) if "id > " in query else None
+        limit = int(query.rsplit("LIMIT ", 1)[1])
+        return [{"id": i} for i in self.ids if after is None or i > after][:limit]
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_scan_pages(prefetch):
+    table = FakeTable(list(range(7)))
+    scan = TableScan(table.fetch, "SELECT * FROM t", ["id"], str, where="x = 1", page_size=3, prefetch=prefetch)
+
+    assert [len(page) for page in scan.pages()] == [3, 3, 1]
+    assert table.queries[1] == "SELECT * FROM t WHERE (x = 1) AND (id > 2) ORDER BY id LIMIT 3"
+    assert scan.last_key == (6,)
+
+
+def test_scan_resumes_after_failure():
+    table = FakeTable(list(range(7)), fail_on_call=2)
+    scan = TableScan(table.fetch, "SELECT * FROM t", ["id"], str, page_size=3)
+    rows = []
+
+    with pytest.raises(ConnectionError):
+        rows.extend(row["id"] for row in scan)
+    assert scan.last_key == (2,)
+    rows.extend(row["id"] for row in scan)
+
+    assert rows == list(range(7))
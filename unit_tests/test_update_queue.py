@@ -0,0 +1,122 @@
+import threading
+from queue import Full
+
+import pytest
+
+from common.databricks.update_queue import UpdateQueue
+
+
+def test_take_and_ack_release_space():
+    queue = UpdateQueue(max_records=3)
+    queue.put("db.a", [1, 2])
+    queue.put("db.b", [3])
+
+    batch = queue.take()
+    assert batch == {"db.a": [1, 2], "db.b": [3]}
+    assert len(queue) == 0
+    assert queue.size == 3
+
+    queue.ack(batch)
+    assert queue.size == 0
+
+
+def test_requeue_keeps_order():
+    queue = UpdateQueue()
+    queue.put("db.a", [1, 2])
+    batch = queue.take()
+    queue.put("db.a", [3])
+
+    queue.requeue(batch)
+
+    assert queue.items() == [("db.a", [1, 2, 3])]
+    assert queue.size == 3
+
+
+def test_full_without_flusher():
+    queue = UpdateQueue(max_records=2)
+    queue.put("db.a", [1, 2])
+
+    with pytest.raises(Full):
+        queue.put("db.a", [3])
+
+
+def test_oversized_batch_accepted_when_empty():
+    queue = UpdateQueue(max_records=2)
+    queue.put("db.a", [1, 2, 3])
+
+    assert queue.size == 3
+
+
+def test_auto_flush_on_size_and_backpressure():
+    queue = UpdateQueue(max_records=4)
+    written = []
+    flushed = threading.Event()
+
+    def _flush():
+        batch = queue.take()
+        written.extend(batch.get("db.a", []))
+        queue.ack(batch)
+        flushed.set()
+
+    queue.start_auto_flush(_flush, flush_size=3, flush_interval_secs=60)
+    try:
+        queue.put("db.a", [1, 2, 3])
+        assert flushed.wait(timeout=5)
+
+        # more than fits, waits for the flusher to make room
+        queue.put("db.a", [4, 5, 6], timeout=5)
+        queue.put("db.a", [7, 8], timeout=5)
+    finally:
+        queue.stop_auto_flush(timeout=5)
+
+    remaining = queue.take()
+    assert written + remaining.get("db.a", []) == [1, 2, 3, 4, 5, 6, 7, 8]
+
+
+def test_auto_flush_on_interval():
+    queue = UpdateQueue()
+    flushed = threading.Event()
+
+    def _flush():
+        queue.ack(queue.take())
+        flushed.set()
+
+    queue.start_auto_flush(_flush, flush_size=100, flush_interval_secs=0.05)
+    try:
+        queue.put("db.a", [1])
+        assert flushed.wait(timeout=5)
+    finally:
+        queue.stop_auto_flush(timeout=5)
+
+    assert queue.size == 0
+
+
+def test_waiting_producer_raises_when_flush_fails():
+    queue = UpdateQueue(max_records=2)
+    error = RuntimeError("warehouse down")
+
+    def _flush():
+        queue.requeue(queue.take(), error=error)
+
+    queue.put("db.a", [1, 2])
+    queue.start_auto_flush(_flush, flush_size=100, flush_interval_secs=60)
+    try:
+        with pytest.raises(Full, match="warehouse down") as raised:
+            queue.put("db.a", [3], timeout=5)
+    finally:
+        queue.stop_auto_flush(timeout=5)
+
+    assert raised.value.__cause__ is error
+    assert queue.items() == [("db.a", [1, 2])]
+    assert queue.size == 2
+
+
+def test_waiting_producer_times_out():
+    queue = UpdateQueue(max_records=1)
+    queue.put("db.a", [1])
+    queue.start_auto_flush(lambda: None, flush_size=100, flush_interval_secs=60)
+    try:
+        with pytest.raises(Full, match="after 0.05 seconds"):
+            queue.put("db.a", [2], timeout=0.05)
+    finally:
+        queue.stop_auto_flush(timeout=5)